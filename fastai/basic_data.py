@@ -3,7 +3,7 @@ from .torch_core import *
 from torch.utils.data.dataloader import default_collate
 
 DatasetType = Enum('DatasetType', 'Train Valid Test Single Fix')
-__all__ = ['DataBunch', 'DeviceDataLoader', 'DatasetType']
+__all__ = ['BatchDataLoader', 'DataBunch', 'DeviceDataLoader', 'DatasetType', 'WorkerPool']
 
 old_dl_init = torch.utils.data.DataLoader.__init__
 
@@ -20,16 +20,167 @@ torch.utils.data.DataLoader.__init__ = intercept_args
 def DataLoader___getattr__(dl, k:str)->Any: return getattr(dl.dataset, k)
 DataLoader.__getattr__ = DataLoader___getattr__
 
+def _first(batch:Collection[Any])->Any: return batch[0]
+
+class _BatchFetcher(Dataset):
+    "Dataset whose items are the batches of `ds` for the lists of indices given by a `BatchSampler`."
+    def __init__(self, ds:Dataset): self.ds = ds
+    def __len__(self)->int: return len(self.ds)
+    def __getitem__(self, idxs:Collection[int])->Any: return self.ds.get_batch(np.array(idxs))
+
+class BatchDataLoader(DataLoader):
+    "A `DataLoader` that fetches each batch of indices of its `batch_sampler` in one call to `dataset.get_batch`."
+    def batch_idxs(self)->Iterator[np.ndarray]:
+        "Index arrays of the batches, sliced from one permutation (or range) for the default random (or sequential) sampler."
+        bsampler = self.batch_sampler
+        sampler = getattr(bsampler, 'sampler', None)
+        # A `RandomSampler` with replacement or a custom `num_samples` isn't a permutation of the dataset.
+        fast = type(bsampler) == BatchSampler and (type(sampler) == SequentialSampler or
+            (type(sampler) == RandomSampler and not sampler.replacement and len(sampler) == len(sampler.data_source)))
+        if not fast:
+            for idxs in bsampler: yield np.array(idxs)
+            return
+        n,bs = len(sampler),bsampler.batch_size
+        idxs = torch.randperm(n).numpy() if type(sampler) == RandomSampler else np.arange(n)
+        for i in range(0, n - n%bs if bsampler.drop_last else n, bs): yield idxs[i:i+bs]
+
+    def __iter__(self):
+        # Per-item access and `collate_fn` if the dataset can't fetch batches (transforms have been added for instance).
+        if not getattr(self.dataset, 'batchable', False): yield from super().__iter__()
+        elif self.num_workers == 0:
+            for idxs in self.batch_idxs(): yield self.dataset.get_batch(idxs)
+        else:
+            # Each worker fetches whole batches: the sampler gives arrays of indices, collated one at a time.
+            yield from DataLoader(_BatchFetcher(self.dataset), sampler=list(self.batch_idxs()), num_workers=self.num_workers,
+                                  collate_fn=_first, pin_memory=self.pin_memory, timeout=self.timeout,
+                                  worker_init_fn=self.worker_init_fn)
+
+def _pool_worker(worker_id:int, loaders:List[Tuple[Dataset,Callable,bool]], index_q:Any, result_q:Any, seed:int,
+                 worker_init_fn:Optional[Callable])->None:
+    "Load the batches of the tasks `(task_id, loader, idxs)` received in `index_q` until `None`, put them in `result_q`."
+    torch.set_num_threads(1)
+    random.seed(seed + worker_id)
+    np.random.seed((seed + worker_id) % 2**32)
+    torch.manual_seed(seed + worker_id)
+    if worker_init_fn is not None: worker_init_fn(worker_id)
+    while True:
+        task = index_q.get()
+        if task is None: return
+        task_id,loader,idxs = task
+        ds,collate_fn,batched = loaders[loader]
+        try: result_q.put((task_id, ds.get_batch(idxs) if batched else collate_fn([ds[i] for i in idxs]), None))
+        except Exception: result_q.put((task_id, None, traceback.format_exc()))
+
+class WorkerPool():
+    "`n_workers` processes loading the batches of several `DataLoader`s, kept alive across epochs and loaders."
+    def __init__(self, n_workers:int=defaults.cpus, prefetch:int=2, timeout:float=0, worker_init_fn:Callable=None):
+        self.n_workers,self.prefetch,self.timeout,self.worker_init_fn = n_workers,prefetch,timeout,worker_init_fn
+        self.loaders,self.workers,self.results,self.abandoned = [],[],{},set()
+        self.next_task,self.lock = 0,threading.Lock()
+
+    def _loader(self, dl:DataLoader)->Tuple[Dataset,Callable,bool]:
+        return dl.dataset,dl.collate_fn,isinstance(dl, BatchDataLoader) and getattr(dl.dataset, 'batchable', False)
+
+    def register(self, dl:DataLoader)->int:
+        "Index of the dataset and collate function of `dl` in the workers, restarting them if they don't have them."
+        loader = self._loader(dl)
+        for i,o in enumerate(self.loaders):
+            if all(a is b for a,b in zip(o[:2], loader[:2])) and o[2] == loader[2]: return i
+        # The workers got their copy of the datasets when they started.
+        self.shutdown()
+        self.loaders.append(loader)
+        return len(self.loaders)-1
+
+    def start(self)->None:
+        "Start the workers, with a copy of the datasets registered so far."
+        if self.workers: return
+        seed = random.randint(0, 2**31)
+        self.index_qs = [torch.multiprocessing.Queue() for _ in range(self.n_workers)]
+        self.result_q = torch.multiprocessing.Queue()
+        self.workers = [torch.multiprocessing.Process(target=_pool_worker, daemon=True,
+                            args=(i, self.loaders, q, self.result_q, seed, self.worker_init_fn)) for i,q in enumerate(self.index_qs)]
+        for w in self.workers: w.start()
+        self.results,self.abandoned = {},set()
+
+    def shutdown(self)->None:
+        "Stop the workers, they are started again (with the datasets in their current state) by the next iteration."
+        if not self.workers: return
+        for q in self.index_qs: q.put(None)
+        for w in self.workers:
+            w.join(timeout=5)
+            if w.is_alive(): w.terminate()
+        self.workers = []
+
+    def restart(self)->None:
+        "Restart the workers, to pick up changes made to the datasets (transforms, processors...) since they started."
+        self.shutdown()
+        self.start()
+
+    def __del__(self): self.shutdown()
+    def __getstate__(self):
+        return {**self.__dict__, 'workers':[], 'results':{}, 'abandoned':set(), 'lock':None, 'index_qs':[], 'result_q':None}
+    def __setstate__(self, state:dict): self.__dict__.update({**state, 'lock':threading.Lock()})
+
+    def _get(self, task_id:int)->Any:
+        "Wait for the batch of `task_id`, keeping the results of the tasks of the other iterations."
+        start = time.time()
+        while True:
+            with self.lock:
+                if task_id in self.results: res = self.results.pop(task_id)
+                else:
+                    try: tid,*res = self.result_q.get(timeout=1)
+                    except queue.Empty:
+                        if not all(w.is_alive() for w in self.workers): raise RuntimeError('A WorkerPool worker exited unexpectedly.')
+                        if self.timeout and time.time() - start > self.timeout:
+                            raise RuntimeError(f'WorkerPool timed out after {self.timeout} seconds.')
+                        continue
+                    if tid in self.abandoned: self.abandoned.remove(tid)
+                    elif tid != task_id: self.results[tid] = res
+                    if tid != task_id: continue
+            b,err = res
+            if err is not None: raise RuntimeError(f'Exception in a WorkerPool worker:\n{err}')
+            return b
+
+    def iterate(self, dl:DataLoader)->Iterator:
+        "Yield the batches of `dl` in order, sending the indices of each batch of the epoch to the workers."
+        loader = self.register(dl)
+        self.start()
+        batched = self.loaders[loader][2]
+        idxs = dl.batch_idxs() if batched else (np.array(b) for b in dl.batch_sampler)
+        tasks = collections.deque()
+        def _send():
+            for b in itertools.islice(idxs, self.n_workers*self.prefetch - len(tasks)):
+                task_id,self.next_task = self.next_task,self.next_task+1
+                self.index_qs[task_id % self.n_workers].put((task_id, loader, b))
+                tasks.append(task_id)
+        try:
+            _send()
+            while tasks:
+                b = self._get(tasks[0])
+                tasks.popleft()
+                _send()
+                yield b
+        finally:
+            # The batches already requested when the iteration stops early are dropped when they arrive.
+            with self.lock:
+                for t in tasks:
+                    if self.results.pop(t, None) is None: self.abandoned.add(t)
+
+class _PrefetchEnd(): pass
+
 @dataclass
 class DeviceDataLoader():
-    "Bind a `DataLoader` to a `torch.device`."
+    "Bind a `DataLoader` to a `torch.device`, processing the next `prefetch` batches in a background thread if `prefetch>0`."
     dl: DataLoader
     device: torch.device
     tfms: List[Callable]=None
     collate_fn: Callable=data_collate
+    prefetch: int=0
+    pool: WorkerPool=None
     def __post_init__(self):
         self.dl.collate_fn=self.collate_fn
         self.tfms = listify(self.tfms)
+        self.n_batches,self.n_starved = 0,0
 
     def __len__(self)->int: return len(self.dl)
     def __getattr__(self,k:str)->Any: return getattr(self.dl, k)
@@ -39,7 +190,7 @@ class DeviceDataLoader():
     @batch_size.setter
     def batch_size(self,v):
         new_kwargs = {**self.dl.init_kwargs, 'batch_size':v, 'collate_fn':self.collate_fn}
-        self.dl = DataLoader(self.dl.dataset, **new_kwargs)
+        self.dl = self.dl.__class__(self.dl.dataset, **new_kwargs)
 
     @property
     def num_workers(self):   return self.dl.num_workers
@@ -56,8 +207,8 @@ class DeviceDataLoader():
     def new(self, **kwargs):
         "Create a new copy of `self` with `kwargs` replacing current values."
         new_kwargs = {**self.dl.init_kwargs, **kwargs}
-        return DeviceDataLoader(DataLoader(self.dl.dataset, **new_kwargs), self.device, self.tfms,
-                                self.collate_fn)
+        return DeviceDataLoader(self.dl.__class__(self.dl.dataset, **new_kwargs), self.device, self.tfms,
+                                self.collate_fn, self.prefetch, self.pool)
 
     def proc_batch(self,b:Tensor)->Tensor:
         "Proces batch `b` of `TensorImage`."
@@ -65,18 +216,70 @@ class DeviceDataLoader():
         for f in listify(self.tfms): b = f(b)
         return b
 
+    def _batches(self)->Iterator:
+        "The batches of `self.dl`, loaded by `self.pool` if there is one and `self.dl` has workers."
+        return self.pool.iterate(self.dl) if self.pool is not None and self.num_workers > 0 else iter(self.dl)
+
     def __iter__(self):
         "Process and returns items from `DataLoader`."
-        for b in self.dl:
+        self.n_batches,self.n_starved = 0,0
+        if self.prefetch > 0:
+            yield from self._prefetch_iter()
+            return
+        for b in self._batches():
             #y = b[1][0] if is_listy(b[1]) else b[1] # XXX: Why is this line here?
+            self.n_batches += 1
             yield self.proc_batch(b)
 
+    def _prefetch_worker(self, q:queue.Queue, stop:threading.Event)->None:
+        "Put the processed batches of `self.dl` in `q` until the end or `stop` is set; exceptions are passed along."
+        def _put(o):
+            while not stop.is_set():
+                try:
+                    q.put(o, timeout=0.1)
+                    return True
+                except queue.Full: pass
+            return False
+        try:
+            for b in self._batches():
+                if not _put((self.proc_batch(b), None)): return
+            _put((_PrefetchEnd, None))
+        except Exception as e: _put((None, e))
+
+    def _prefetch_iter(self):
+        "Yield the batches processed by a background thread, keeping at most `self.prefetch` of them in advance."
+        q,stop = queue.Queue(maxsize=self.prefetch),threading.Event()
+        worker = threading.Thread(target=self._prefetch_worker, args=(q, stop), daemon=True)
+        worker.start()
+        try:
+            while True:
+                if q.empty(): self.n_starved += 1
+                b,e = q.get()
+                if e is not None: raise e
+                if b is _PrefetchEnd: return
+                self.n_batches += 1
+                yield b
+        finally:
+            # Also executed when the consumer stops early (`break` in LR Finder, early stopping...).
+            stop.set()
+            worker.join()
+
+    @property
+    def starvation(self)->float:
+        "Fraction of the batches of the last iteration the model had to wait for with `prefetch>0`."
+        return self.n_starved / max(1, self.n_batches)
+
     @classmethod
     def create(cls, dataset:Dataset, bs:int=64, shuffle:bool=False, device:torch.device=defaults.device,
-               tfms:Collection[Callable]=tfms, num_workers:int=defaults.cpus, collate_fn:Callable=data_collate, **kwargs:Any):
-        "Create DeviceDataLoader from `dataset` with `bs` and `shuffle`: processs using `num_workers`."
+               tfms:Collection[Callable]=tfms, num_workers:int=defaults.cpus, collate_fn:Callable=data_collate,
+               prefetch:int=0, **kwargs:Any):
+        "Create DeviceDataLoader from `dataset` with `bs` and `shuffle`: processs using `num_workers`, `prefetch` batches in advance."
         return cls(DataLoader(dataset, batch_size=bs, shuffle=shuffle, num_workers=num_workers, **kwargs),
-                   device=device, tfms=tfms, collate_fn=collate_fn)
+                   device=device, tfms=tfms, collate_fn=collate_fn, prefetch=prefetch)
+
+def _data_loader(ds:Dataset, batch_fetch:bool=True)->type:
+    "The `DataLoader` class for `ds`, `BatchDataLoader` when it can fetch whole batches and `batch_fetch`."
+    return BatchDataLoader if batch_fetch and getattr(ds, 'batchable', False) else DataLoader
 
 class DataBunch():
     "Bind `train_dl`,`valid_dl` and `test_dl` in a a data object."
@@ -84,15 +287,15 @@ class DataBunch():
 
     def __init__(self, train_dl:DataLoader, valid_dl:DataLoader, fix_dl:DataLoader, test_dl:Optional[DataLoader]=None,
                  device:torch.device=None, tfms:Optional[Collection[Callable]]=None, path:PathOrStr='.',
-                 collate_fn:Callable=data_collate, no_check:bool=False):
+                 collate_fn:Callable=data_collate, no_check:bool=False, prefetch:int=0):
         self.tfms = listify(tfms)
         self.device = defaults.device if device is None else device
         assert not isinstance(train_dl,DeviceDataLoader)
         def _create_dl(dl, **kwargs):
             return DeviceDataLoader(dl, self.device, self.tfms, collate_fn, **kwargs)
-        self.train_dl,self.valid_dl,self.fix_dl = map(_create_dl, [train_dl,valid_dl,fix_dl])
+        self.train_dl,self.valid_dl,self.fix_dl = map(partial(_create_dl, prefetch=prefetch), [train_dl,valid_dl,fix_dl])
         self.single_dl = _create_dl(DataLoader(valid_dl.dataset, batch_size=1, num_workers=0))
-        self.test_dl  = _create_dl(test_dl) if test_dl is not None else None
+        self.test_dl  = _create_dl(test_dl, prefetch=prefetch) if test_dl is not None else None
         self.path = Path(path)
         if not no_check: self.sanity_check()
 
@@ -109,13 +312,15 @@ class DataBunch():
     @classmethod
     def create(cls, train_ds:Dataset, valid_ds:Dataset, test_ds:Optional[Dataset]=None, path:PathOrStr='.', bs:int=64,
                num_workers:int=defaults.cpus, tfms:Optional[Collection[Callable]]=None, device:torch.device=None,
-               collate_fn:Callable=data_collate, no_check:bool=False)->'DataBunch':
-        "Create a `DataBunch` from `train_ds`, `valid_ds` and maybe `test_ds` with a batch size of `bs`."
+               collate_fn:Callable=data_collate, no_check:bool=False, prefetch:int=0, batch_fetch:bool=True,
+               persistent_workers:bool=False)->'DataBunch':
+        "Create a `DataBunch` from `train_ds`, `valid_ds` and maybe `test_ds` with a batch size of `bs`, fetching whole batches if `batch_fetch`."
         datasets = cls._init_ds(train_ds, valid_ds, test_ds)
         val_bs = bs
-        dls = [DataLoader(d, b, shuffle=s, drop_last=(s and b>1), num_workers=num_workers) for d,b,s in
+        dls = [_data_loader(d, batch_fetch)(d, b, shuffle=s, drop_last=(s and b>1), num_workers=num_workers) for d,b,s in
                zip(datasets, (bs,val_bs,val_bs,val_bs), (True,False,False,False))]
-        return cls(*dls, path=path, device=device, tfms=tfms, collate_fn=collate_fn, no_check=no_check)
+        data = cls(*dls, path=path, device=device, tfms=tfms, collate_fn=collate_fn, no_check=no_check, prefetch=prefetch)
+        return data.use_worker_pool() if persistent_workers and num_workers > 0 else data
 
     def __getattr__(self,k:int)->Any: return getattr(self.train_dl, k)
 
@@ -167,6 +372,25 @@ class DataBunch():
         else : ys = [self.train_ds.y.reconstruct(grab_idx(y, i)) for i in range(rows)]
         self.train_ds.x.show_xys(xs, ys, **kwargs)
 
+    def use_worker_pool(self, n_workers:int=None, **kwargs:Any)->'DataBunch':
+        "Load the batches of all the dataloaders with workers in one `WorkerPool` of `n_workers` (their `num_workers` by default)."
+        # Streaming datasets have no indices to send to the workers.
+        dls = [dl for dl in self.dls if dl.num_workers > 0 and not isinstance(dl.dataset, IterableDataset)]
+        if not dls: return self
+        pool = WorkerPool(ifnone(n_workers, max(dl.num_workers for dl in dls)), **kwargs)
+        for dl in dls:
+            pool.register(dl.dl)
+            dl.pool = pool
+        return self
+
+    def share(self, path:PathOrStr=None)->'DataBunch':
+        "Move the arrays of the datasets to memory-mapped files in `path` (shared memory by default) that the workers map instead of copying."
+        path = Path(ifnone(path, shared_dir()))
+        path.mkdir(parents=True, exist_ok=True)
+        for name,dl in zip(['train', 'valid', 'fix', 'single', 'test'], self.dls):
+            if hasattr(dl.dataset, 'share'): dl.dataset.share(path, name)
+        return self
+
     def export(self, fname:str='export.pkl'):
         "Export the minimal state of `self` for inference in `self.path/fname`."
         xtra = dict(normalize=self.norm.keywords) if getattr(self, 'norm', False) else {}
@@ -196,6 +420,7 @@ class DataBunch():
         "Check the underlying data in the training set can be properly loaded."
         final_message = "You can deactivate this warning by passing `no_check=True`."
         if not hasattr(self.train_ds, 'items') or len(self.train_ds.items) == 0 or not hasattr(self.train_dl, 'batch_sampler'): return
+        if isinstance(self.train_ds, IterableDataset): return
         idx = next(iter(self.train_dl.batch_sampler))
         try: samples = [self.train_ds[i] for i in idx]
         except:
@@ -3,11 +3,30 @@ from .torch_core import *
 from .basic_data import *
 from .callback import *
 
-__all__ = ['Learner', 'LearnerCallback', 'Recorder', 'RecordOnCPU', 'fit', 'loss_batch', 'train_epoch', 'validate',
-           'get_preds']
+__all__ = ['Learner', 'LearnerCallback', 'NoBar', 'Recorder', 'RecordOnCPU', 'ValueHistory', 'fit', 'loss_batch', 'train_epoch', 'validate',
+           'get_preds', 'iter_preds', 'save_preds']
 
 defaults.lr = slice(3e-3)
 defaults.wd = 1e-2
+defaults.recorder_max_len = None
+defaults.headless = False
+
+class NoBar():
+    "Stand-in for the `fastprogress` bars when headless: iterates over `gen` and ignores all the display calls."
+    def __init__(self, gen:Iterable, **kwargs:Any): self.gen = gen
+    def __iter__(self)->Iterator: return iter(self.gen)
+    def __len__(self)->int: return len(self.gen)
+    def write(self, *args:Any, **kwargs:Any)->None: pass
+    def update(self, *args:Any, **kwargs:Any)->None: pass
+    def update_graph(self, *args:Any, **kwargs:Any)->None: pass
+    def show_imgs(self, *args:Any, **kwargs:Any)->None: pass
+
+def _master_bar(gen:Iterable, no_bar:bool=False)->Union[MasterBar,NoBar]:
+    return NoBar(gen) if no_bar or defaults.headless else master_bar(gen)
+def _progress_bar(gen:Iterable, no_bar:bool=False, **kwargs:Any)->Union[ProgressBar,NoBar]:
+    # The children of a hidden master bar are hidden too.
+    if no_bar or defaults.headless or isinstance(kwargs.get('parent'), NoBar): return NoBar(gen)
+    return progress_bar(gen, **kwargs)
 
 def loss_batch(model:nn.Module, xb:Tensor, yb:Tensor, loss_func:OptLossFunc=None, opt:OptOptimizer=None,
                cb_handler:Optional[CallbackHandler]=None)->Tuple[Union[Tensor,int,float,str]]:
@@ -23,30 +42,85 @@ def loss_batch(model:nn.Module, xb:Tensor, yb:Tensor, loss_func:OptLossFunc=None
 
     if opt is not None:
         loss = cb_handler.on_backward_begin(loss)
-        loss.backward()
-        cb_handler.on_backward_end()
-        opt.step()
-        cb_handler.on_step_end()
-        opt.zero_grad()
+        # When accumulating, the gradients are averaged over the batches of the group and we only step on the last one.
+        accum_size = cb_handler.accum_size(cb_handler.state_dict.get('train', True))
+        (loss / accum_size if accum_size > 1 else loss).backward()
+        if cb_handler.state_dict.get('step_batch', True):
+            if not cb_handler.on_backward_end(): opt.step()
+            cb_handler.on_step_end()
+            opt.zero_grad()
 
-    return loss.detach().cpu()
+    return loss.detach() if cb_handler.deferred_sync else loss.detach().cpu()
 
 def get_preds(model:nn.Module, dl:DataLoader, pbar:Optional[PBar]=None, cb_handler:Optional[CallbackHandler]=None,
-              activ:nn.Module=None, loss_func:OptLossFunc=None, n_batch:Optional[int]=None) -> List[Tensor]:
+              activ:nn.Module=None, loss_func:OptLossFunc=None, n_batch:Optional[int]=None, no_bar:bool=False) -> List[Tensor]:
     "Tuple of predictions and targets, and optional losses (if `loss_func`) using `dl`, max batches `n_batch`."
-    res = [torch.cat(o).cpu() for o in
-           zip(*validate(model, dl, cb_handler=cb_handler, pbar=pbar, average=False, n_batch=n_batch))]
-    if loss_func is not None: res.append(calc_loss(res[0], res[1], loss_func))
-    if activ is not None: res[0] = activ(res[0])
-    return res
+    return [torch.cat(o) for o in zip(*iter_preds(model, dl, pbar=pbar, cb_handler=cb_handler, activ=activ,
+                                                   loss_func=loss_func, n_batch=n_batch, no_bar=no_bar))]
+
+def iter_preds(model:nn.Module, dl:DataLoader, pbar:Optional[PBar]=None, cb_handler:Optional[CallbackHandler]=None,
+               activ:nn.Module=None, loss_func:OptLossFunc=None, n_batch:Optional[int]=None,
+               no_bar:bool=False)->Iterator[List[Tensor]]:
+    "Yield the predictions and targets, and optional losses (if `loss_func`), of each batch of `dl` on the cpu."
+    model.eval()
+    # Grad mode is only turned off while computing a batch, not in the code of the consumer between two batches.
+    for i,(xb,yb) in enumerate(_progress_bar(dl, no_bar, parent=pbar, leave=(pbar is not None))):
+        with torch.no_grad():
+            if cb_handler: xb, yb = cb_handler.on_batch_begin(xb, yb, train=False)
+            out = loss_batch(model, xb, yb, cb_handler=cb_handler)
+            stop = cb_handler and cb_handler.on_batch_end(out)
+            res = [to_cpu(o) for o in out]
+            if loss_func is not None: res.append(calc_loss(res[0], res[1], loss_func))
+            if activ is not None: res[0] = activ(res[0])
+        yield res
+        if stop or (n_batch and i+1 >= n_batch): break
+
+def _n_items(dl:DataLoader, n_batch:Optional[int]=None)->int:
+    "Number of items in the first `n_batch` batches of `dl` (all of them if `None`)."
+    n,bs = len(dl.dataset),dl.batch_size
+    if bs is None: return n
+    if dl.drop_last: n -= n % bs
+    return n if n_batch is None else min(n, n_batch*bs)
+
+def _truncate_npy(fname:PathOrStr, arr:np.ndarray, n:int)->np.ndarray:
+    "Rewrite the `.npy` file `fname` of the memory-mapped `arr` with its first `n` rows only."
+    tmp = f'{fname}.tmp'
+    res = np.lib.format.open_memmap(tmp, mode='w+', dtype=arr.dtype, shape=(n,)+arr.shape[1:])
+    res[:] = arr[:n]
+    res.flush()
+    del res,arr
+    os.replace(tmp, fname)
+    return np.load(fname, mmap_mode='r+')
+
+def save_preds(model:nn.Module, dl:DataLoader, fname:PathOrStr, pbar:Optional[PBar]=None,
+               cb_handler:Optional[CallbackHandler]=None, activ:nn.Module=None, loss_func:OptLossFunc=None,
+               with_target:bool=True, n_batch:Optional[int]=None, no_bar:bool=False)->List[np.ndarray]:
+    "Write predictions, targets (if `with_target`) and losses (if `loss_func`) using `dl` batch by batch in `fname`_*.npy."
+    names = ['preds'] + (['targets'] if with_target else []) + (['losses'] if loss_func is not None else [])
+    n,res,i = _n_items(dl, n_batch),None,0
+    for b in iter_preds(model, dl, pbar=pbar, cb_handler=cb_handler, activ=activ, loss_func=loss_func, n_batch=n_batch,
+                        no_bar=no_bar):
+        if not with_target: b = b[:1] + b[2:]
+        b = [to_np(o) for o in b]
+        if res is None: res = [np.lib.format.open_memmap(f'{fname}_{name}.npy', mode='w+', dtype=o.dtype, shape=(n,)+o.shape[1:])
+                               for name,o in zip(names,b)]
+        for r,o in zip(res,b): r[i:i+len(o)] = o
+        i += len(b[0])
+    if res is None: return []
+    for r in res: r.flush()
+    if i == n: return res
+    # A callback stopped early: the rows left would look like predictions.
+    warn(f'Only {i} of the {n} items of `dl` were predicted, the saved arrays are truncated to them.')
+    return [_truncate_npy(f'{fname}_{name}.npy', r, i) for name,r in zip(names,res)]
 
 def validate(model:nn.Module, dl:DataLoader, loss_func:OptLossFunc=None, cb_handler:Optional[CallbackHandler]=None,
-             pbar:Optional[PBar]=None, average=True, n_batch:Optional[int]=None)->Iterator[Tuple[Union[Tensor,int],...]]:
+             pbar:Optional[PBar]=None, average=True, n_batch:Optional[int]=None,
+             no_bar:bool=False)->Iterator[Tuple[Union[Tensor,int],...]]:
     "Calculate `loss_func` of `model` on `dl` in evaluation mode."
     model.eval()
     with torch.no_grad():
         val_losses,nums = [],[]
-        for xb,yb in progress_bar(dl, parent=pbar, leave=(pbar is not None)):
+        for xb,yb in _progress_bar(dl, no_bar, parent=pbar, leave=(pbar is not None)):
             if cb_handler: xb, yb = cb_handler.on_batch_begin(xb, yb, train=False)
             val_losses.append(loss_batch(model, xb, yb, loss_func, cb_handler=cb_handler))
             if not is_listy(yb): yb = [yb]
@@ -66,20 +140,37 @@ def train_epoch(model:nn.Module, dl:DataLoader, opt:optim.Optimizer, loss_func:L
         opt.step()
         opt.zero_grad()
 
+def _batches_left(dl:DataLoader, n_done:int, epoch_rng:dict)->Iterator[Tuple[Tensor,Tensor]]:
+    "The batches of `dl` after the first `n_done` of an epoch that started from the random states `epoch_rng`."
+    rng = rng_states()
+    # Draws the same shuffle and batches as the interrupted epoch, then goes back to the random states of the checkpoint.
+    set_rng_states(epoch_rng)
+    it = iter(dl)
+    for _ in range(n_done): next(it)
+    set_rng_states(rng)
+    yield from it
+
 def fit(epochs:int, model:nn.Module, loss_func:LossFunction, opt:optim.Optimizer,
-        data:DataBunch, callbacks:Optional[CallbackList]=None, metrics:OptMetrics=None)->None:
-    "Fit the `model` on `data` and learn using `loss_func` and `opt`."
-    cb_handler = CallbackHandler(callbacks, metrics)
-    pbar = master_bar(range(epochs))
-    cb_handler.on_train_begin(epochs, pbar=pbar, metrics=metrics)
+        data:DataBunch, callbacks:Optional[CallbackList]=None, metrics:OptMetrics=None, sync_every:int=1,
+        n_accum:int=1, resume_state:Optional[dict]=None, no_bar:bool=False)->None:
+    "Fit the `model` on `data` and learn using `loss_func` and `opt`, copying losses to the host every `sync_every` batches."
+    cb_handler = CallbackHandler(callbacks, metrics, sync_every=sync_every, n_accum=n_accum)
+    pbar = _master_bar(range(epochs), no_bar)
+    cb_handler.on_train_begin(epochs, pbar=pbar, metrics=metrics, epoch_len=len(data.train_dl))
+    if resume_state is not None: cb_handler.load_state(resume_state)
+    # Goes through `OptimWrapper.zero_grad`, which keeps the gradients of the model as views of the flat ones.
+    if n_accum > 1: opt.zero_grad()
 
     exception=False
     try:
         for epoch in pbar:
+            if epoch < cb_handler.state_dict['epoch']: continue
             model.train()
             cb_handler.on_epoch_begin()
+            n_done = cb_handler.state_dict['num_batch']
+            train_dl = data.train_dl if n_done == 0 else _batches_left(data.train_dl, n_done, cb_handler.epoch_rng)
 
-            for xb,yb in progress_bar(data.train_dl, parent=pbar):
+            for xb,yb in _progress_bar(train_dl, total=len(data.train_dl)-n_done, parent=pbar):
                 xb, yb = cb_handler.on_batch_begin(xb, yb)
                 loss = loss_batch(model, xb, yb, loss_func, opt, cb_handler)
                 if cb_handler.on_batch_end(loss): break
@@ -134,6 +225,10 @@ class Learner():
     callback_fns:Collection[Callable]=None
     callbacks:Collection[Callback]=field(default_factory=list)
     layer_groups:Collection[nn.Module]=None
+    sync_every:int=1
+    n_accum:int=1
+    flat_params:bool=False
+    no_bar:bool=False
     def __post_init__(self)->None:
         "Setup path,metrics, callbacks and ensure model directory exists."
         self.path = Path(ifnone(self.path, self.data.path))
@@ -162,12 +257,15 @@ class Learner():
         if not getattr(self, 'opt', False): self.create_opt(lr, wd)
         else: self.opt.lr,self.opt.wd = lr,wd
         callbacks = [cb(self) for cb in self.callback_fns] + listify(callbacks)
+        resume_state,self.resume_state = getattr(self, 'resume_state', None),None
         fit(epochs, self.model, self.loss_func, opt=self.opt, data=self.data, metrics=self.metrics,
-            callbacks=self.callbacks+callbacks)
+            callbacks=self.callbacks+callbacks, sync_every=self.sync_every, n_accum=self.n_accum, resume_state=resume_state,
+            no_bar=self.no_bar)
 
     def create_opt(self, lr:Floats, wd:Floats=0.)->None:
         "Create optimizer with `lr` learning rate and `wd` weight decay."
-        self.opt = OptimWrapper.create(self.opt_func, lr, self.layer_groups, wd=wd, true_wd=self.true_wd, bn_wd=self.bn_wd)
+        self.opt = OptimWrapper.create(self.opt_func, lr, self.layer_groups, wd=wd, true_wd=self.true_wd, bn_wd=self.bn_wd,
+                                       flat_params=self.flat_params)
 
     def split(self, split_on:SplitFuncOrIdxList)->None:
         "Split the model at `split_on`."
@@ -176,6 +274,8 @@ class Learner():
 
     def freeze_to(self, n:int)->None:
         "Freeze layers up to layer `n`."
+        # Features cached with `cache_body_features` are only valid for the current freezing.
+        if getattr(self, 'feature_cache', None) is not None: self.feature_cache.restore(self)
         for g in self.layer_groups[:n]:
             for l in g:
                 if not self.train_bn or not isinstance(l, bn_types): requires_grad(l, False)
@@ -227,7 +327,22 @@ class Learner():
         "Return predictions and targets on `ds_type` dataset."
         lf = self.loss_func if with_loss else None
         return get_preds(self.model, self.dl(ds_type), cb_handler=CallbackHandler(self.callbacks),
-                         activ=_loss_func2activ(self.loss_func), loss_func=lf, n_batch=n_batch, pbar=pbar)
+                         activ=_loss_func2activ(self.loss_func), loss_func=lf, n_batch=n_batch, pbar=pbar, no_bar=self.no_bar)
+
+    def iter_preds(self, ds_type:DatasetType=DatasetType.Valid, with_loss:bool=False, n_batch:Optional[int]=None,
+                   pbar:Optional[PBar]=None)->Iterator[List[Tensor]]:
+        "Yield predictions and targets on `ds_type` dataset batch by batch."
+        lf = self.loss_func if with_loss else None
+        return iter_preds(self.model, self.dl(ds_type), cb_handler=CallbackHandler(self.callbacks),
+                          activ=_loss_func2activ(self.loss_func), loss_func=lf, n_batch=n_batch, pbar=pbar, no_bar=self.no_bar)
+
+    def save_preds(self, fname:PathOrStr, ds_type:DatasetType=DatasetType.Valid, with_target:bool=True,
+                   with_loss:bool=False, n_batch:Optional[int]=None, pbar:Optional[PBar]=None)->List[np.ndarray]:
+        "Write predictions and targets on `ds_type` dataset to memory-mapped arrays in `fname`_*.npy and return them."
+        lf = self.loss_func if with_loss else None
+        return save_preds(self.model, self.dl(ds_type), fname, cb_handler=CallbackHandler(self.callbacks),
+                          activ=_loss_func2activ(self.loss_func), loss_func=lf, with_target=with_target,
+                          n_batch=n_batch, pbar=pbar, no_bar=self.no_bar)
 
     def pred_batch(self, ds_type:DatasetType=DatasetType.Valid, batch:Tuple=None, reconstruct:bool=False) -> List[Tensor]:
         "Return output of the model on one batch from `ds_type` dataset."
@@ -269,13 +384,36 @@ class Learner():
         out = ds.y.reconstruct(pred, ds.x.reconstruct(x[0])) if has_arg(ds.y.reconstruct, 'x') else ds.y.reconstruct(pred)
         return out, pred, res[0]
 
+    def predict_batch(self, items:Collection, bs:Optional[int]=None, **kwargs)->List[Tuple]:
+        "Return predicted class, label and probabilities for each of `items` (as `predict`), running the model on `bs` items at a time."
+        ds,dl = self.data.single_ds,self.data.single_dl
+        bs,norm = ifnone(bs, self.data.batch_size),getattr(self.data,'norm',False)
+        activ,cb_handler = _loss_func2activ(self.loss_func),CallbackHandler(self.callbacks)
+        with_x = has_arg(ds.y.reconstruct, 'x')
+        self.model.eval()
+        res = []
+        for i in range(0, len(items), bs):
+            samples = []
+            for item in items[i:i+bs]:
+                with ds.set_item(item): samples.append(ds[0])
+            xb,yb = dl.proc_batch(dl.collate_fn(samples))
+            xb,yb = cb_handler.on_batch_begin(xb, yb, train=False)
+            with torch.no_grad(): preds = activ(loss_batch(self.model, xb, yb, cb_handler=cb_handler)[0])
+            if norm and norm.keywords.get('do_y',False): preds = self.data.denorm(preds)
+            if with_x: xb = self.data.denorm(to_cpu(xb)) if norm else xb
+            for j,raw in enumerate(preds):
+                pred = ds.y.analyze_pred(raw, **kwargs)
+                out = ds.y.reconstruct(pred, ds.x.reconstruct(grab_idx(xb, j))) if with_x else ds.y.reconstruct(pred)
+                res.append((out, pred, raw))
+        return res
+
     def validate(self, dl=None, callbacks=None, metrics=None):
         "Validate on `dl` with potential `callbacks` and `metrics`."
         dl = ifnone(dl, self.data.valid_dl)
         metrics = ifnone(metrics, self.metrics)
-        cb_handler = CallbackHandler(self.callbacks + ifnone(callbacks, []), metrics)
+        cb_handler = CallbackHandler(self.callbacks + ifnone(callbacks, []), metrics, sync_every=self.sync_every)
         cb_handler.on_epoch_begin()
-        val_metrics = validate(self.model, dl, self.loss_func, cb_handler)
+        val_metrics = validate(self.model, dl, self.loss_func, cb_handler, no_bar=self.no_bar)
         cb_handler.on_epoch_end(val_metrics)
         return cb_handler.state_dict['last_metrics']
 
@@ -322,14 +460,54 @@ class LearnerCallback(Callback):
     @property
     def cb_name(self): return camel2snake(self.__class__.__name__)
 
+class ValueHistory():
+    "Floats recorded at each iteration in a preallocated array, keeping one value out of two each time `max_len` are stored."
+    def __init__(self, max_len:Optional[int]=None, capacity:int=1024):
+        assert max_len is None or max_len >= 2, "`max_len` should be at least 2."
+        self.max_len = max_len
+        self.values = np.empty(capacity if max_len is None else min(capacity, max_len), dtype=np.float32)
+        self.n,self.n_iter,self.stride,self.max = 0,0,1,-np.inf
+
+    def append(self, v:TensorOrNumber)->None:
+        "Record `v` for the next iteration."
+        v = float(v)
+        if v > self.max: self.max = v
+        self.n_iter += 1
+        if (self.n_iter-1) % self.stride != 0: return
+        if self.n == len(self.values):
+            size = 2*self.n if self.max_len is None else min(2*self.n, self.max_len)
+            self.values = np.concatenate([self.values, np.empty(size-self.n, dtype=np.float32)])
+        self.values[self.n] = v
+        self.n += 1
+        if self.n == self.max_len:
+            # Only the values of the iterations multiple of the new stride are kept.
+            kept = self.values[:self.n:2].copy()
+            self.values[:len(kept)],self.n,self.stride = kept,len(kept),2*self.stride
+
+    def extend(self, vs:Collection[TensorOrNumber])->None:
+        "Record the values `vs` of the next iterations."
+        for v in vs: self.append(v)
+
+    @property
+    def iterations(self)->np.ndarray:
+        "Iterations of the recorded values."
+        return np.arange(self.n) * self.stride
+
+    def __len__(self)->int: return self.n
+    def __getitem__(self, idx)->Union[float,np.ndarray]: return self.values[:self.n][idx]
+    def __iter__(self)->Iterator[float]: return iter(self.values[:self.n])
+    def __array__(self, dtype=None, copy=None)->np.ndarray:
+        return np.array(self.values[:self.n], dtype=dtype, copy=copy)
+
 class Recorder(LearnerCallback):
-    "A `LearnerCallback` that records epoch, loss, opt and metric data during training."
+    "A `LearnerCallback` that records epoch, loss, opt and metric data during training, in `ValueHistory`s of `max_len` for each batch."
     _order=-10
-    def __init__(self, learn:Learner):
+    def __init__(self, learn:Learner, max_len:Optional[int]=None):
         super().__init__(learn)
         self.opt = self.learn.opt
         self.train_dl = self.learn.data.train_dl
         self.no_val,self.silent = False,False
+        self.max_len = ifnone(max_len, defaults.recorder_max_len)
 
     def on_train_begin(self, pbar:PBar, metrics_names:Collection[str], **kwargs:Any)->None:
         "Initialize recording status at beginning of training."
@@ -338,7 +516,9 @@ class Recorder(LearnerCallback):
         self.names += metrics_names
         if hasattr(self, '_added_met_names'): self.names += self._added_met_names
         if not self.silent: self.pbar.write(self.names, table=True)
-        self.losses,self.val_losses,self.lrs,self.moms,self.metrics,self.nb_batches = [],[],[],[],[],[]
+        self.losses,self.lrs,self.moms = [ValueHistory(self.max_len) for _ in range(3)]
+        self.val_losses,self.metrics,self.nb_batches = [],[],[]
+        self._pending_losses = []
 
     def on_batch_begin(self, train, **kwargs:Any)->None:
         "Record learning rate and momentum at beginning of batch."
@@ -346,15 +526,25 @@ class Recorder(LearnerCallback):
             self.lrs.append(self.opt.lr)
             self.moms.append(self.opt.mom)
 
-    def on_backward_begin(self, smooth_loss:Tensor, **kwargs:Any)->None:
+    def on_backward_begin(self, smooth_loss:Tensor, sync_batch:bool=True, **kwargs:Any)->None:
         "Record the loss before any other callback has a chance to modify it."
+        if not sync_batch:
+            self._pending_losses.append(smooth_loss)
+            return
+        self.flush()
         self.losses.append(smooth_loss)
         if self.pbar is not None and hasattr(self.pbar,'child'):
             self.pbar.child.comment = f'{smooth_loss:.4f}'
 
+    def flush(self)->None:
+        "Copy the smoothed losses still on the device to `self.losses` in one transfer."
+        if self._pending_losses: self.losses.extend(to_np(torch.stack(self._pending_losses)))
+        self._pending_losses = []
+
     def on_epoch_end(self, epoch:int, num_batch:int, smooth_loss:Tensor,
                      last_metrics=MetricsList, **kwargs:Any)->bool:
         "Save epoch info: num_batch, smooth_loss, metrics."
+        self.flush()
         self.nb_batches.append(num_batch)
         if last_metrics is not None:
             self.val_losses.append(last_metrics[0])
@@ -364,6 +554,15 @@ class Recorder(LearnerCallback):
         self.format_stats([epoch, smooth_loss] + last_metrics)
         return False
 
+    def on_train_end(self, **kwargs:Any)->None:
+        "Make sure all the recorded losses are on the host."
+        self.flush()
+
+    def get_state(self)->dict:
+        "Return a copy of the recorded history."
+        self.flush()
+        return {k:deepcopy(getattr(self, k)) for k in ('losses', 'val_losses', 'lrs', 'moms', 'metrics', 'nb_batches')}
+
     def format_stats(self, stats:TensorOrNumList)->None:
         "Format stats before printing."
         str_stats = []
@@ -381,7 +580,7 @@ class Recorder(LearnerCallback):
 
     def plot_lr(self, show_moms=False)->None:
         "Plot learning rate, `show_moms` to include momentum."
-        iterations = range_of(self.lrs)
+        iterations = self.lrs.iterations
         if show_moms:
             _, axs = plt.subplots(1,2, figsize=(12,4))
             axs[0].plot(iterations, self.lrs)
@@ -405,8 +604,9 @@ class Recorder(LearnerCallback):
         assert last<=len(self.nb_batches), f"We can only plot up to the last {len(self.nb_batches)} epochs. Please adapt 'last' parameter accordingly."
         _, ax = plt.subplots(1,1)
         l_b = np.sum(self.nb_batches[-last:])
-        iterations = range_of(self.losses)[-l_b:]
-        ax.plot(iterations, self.losses[-l_b:], label='Train')
+        iterations = self.losses.iterations
+        idx = iterations >= self.losses.n_iter - l_b
+        ax.plot(iterations[idx], self.losses[idx], label='Train')
         val_iter = self.nb_batches[-last:]
         val_iter = np.cumsum(val_iter)+np.sum(self.nb_batches[:-last])
         ax.plot(val_iter, self.val_losses[-last:], label='Validation')
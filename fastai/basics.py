@@ -3,10 +3,13 @@ from .callback import *
 from .core import *
 from .basic_data import *
 from .data_block import *
+from .data_stream import *
 from .layers import *
 from .metrics import *
 from .torch_core import *
 from .train import *
+from .inference import *
+from .tune import *
 from .datasets import *
 from .utils.collect_env import *
 from .version import *
@@ -0,0 +1,11 @@
+"Micro-benchmarks of the hot paths of the library, run with `python -m fastai.benchmarks.<name>`"
+from ..torch_core import *
+
+def time_ms(f:Callable, n_iter:int)->float:
+    "Average time in ms of `n_iter` calls to `f`, after one warm-up call."
+    f()
+    if torch.cuda.is_available(): torch.cuda.synchronize()
+    start = time.perf_counter()
+    for _ in range(n_iter): f()
+    if torch.cuda.is_available(): torch.cuda.synchronize()
+    return (time.perf_counter() - start) / n_iter * 1e3
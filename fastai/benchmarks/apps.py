@@ -0,0 +1,122 @@
+"End-to-end throughput of the four applications on synthetic data, run with `python -m fastai.benchmarks.apps [fname.json]`"
+from ..torch_core import *
+from ..basic_train import *
+from ..text import *
+from ..tabular import *
+from ..collab import *
+from ..vision import *
+from ..version import __version__
+from . import time_ms
+import subprocess, tempfile
+
+__all__ = ['bench_apps', 'bench_learner', 'collab_bench_learner', 'compare_benchmarks', 'tabular_bench_learner',
+           'text_clas_bench_learner', 'text_lm_bench_learner', 'vision_bench_learner']
+
+def _seed(seed:int)->None:
+    random.seed(seed)
+    np.random.seed(seed)
+    torch.manual_seed(seed)
+
+def vision_bench_learner(path:PathOrStr, n_items:int=256, size:int=64, bs:int=32, num_workers:int=0)->Learner:
+    "A resnet18 `create_cnn` on `n_items` random images of `size` in two classes, written in `path` through `ImageItemList`."
+    path = Path(path)
+    for i in range(n_items):
+        fname = path/f'class{i%2}'/f'{i}.png'
+        fname.parent.mkdir(parents=True, exist_ok=True)
+        PIL.Image.fromarray(np.random.randint(0, 256, (size,size,3), dtype=np.uint8)).save(fname)
+    data = (ImageItemList.from_folder(path).random_split_by_pct(0.2, seed=0).label_from_folder()
+            .transform(get_transforms(), size=size).databunch(bs=bs, num_workers=num_workers).normalize(imagenet_stats))
+    return create_cnn(data, models.resnet18, pretrained=False)
+
+def _corpus(n_items:int, n_vocab:int, max_len:int)->Tuple[Vocab,Collection[np.ndarray]]:
+    "A `Vocab` of `n_vocab` fake words and `n_items` texts of random words and lengths up to `max_len`."
+    vocab = Vocab([UNK, PAD] + [f'w{i}' for i in range(n_vocab-2)])
+    return vocab,[np.random.randint(2, n_vocab, np.random.randint(max_len//4, max_len)) for _ in range(n_items)]
+
+def text_clas_bench_learner(path:PathOrStr, n_items:int=1000, n_vocab:int=5000, max_len:int=200, bs:int=64,
+                            num_workers:int=0)->Learner:
+    "A `text_classifier_learner` on a `TextClasDataBunch` of `n_items` random texts (padded with `pad_collate`)."
+    vocab,ids = _corpus(n_items, n_vocab, max_len)
+    lbls,n_val = np.random.randint(0, 2, n_items),n_items//5
+    data = TextClasDataBunch.from_ids(path, vocab, ids[n_val:], ids[:n_val], train_lbls=lbls[n_val:],
+                                      valid_lbls=lbls[:n_val], classes=[0,1], bs=bs, num_workers=num_workers)
+    return text_classifier_learner(data, emb_sz=100, nh=200, nl=2)
+
+def text_lm_bench_learner(path:PathOrStr, n_items:int=1000, n_vocab:int=5000, max_len:int=200, bs:int=32,
+                          bptt:int=70)->Learner:
+    "A `language_model_learner` on a `TextLMDataBunch` of `n_items` random texts."
+    vocab,ids = _corpus(n_items, n_vocab, max_len)
+    n_val = n_items//5
+    data = TextLMDataBunch.from_ids(path, vocab, ids[n_val:], ids[:n_val], bs=bs, bptt=bptt)
+    return language_model_learner(data, bptt=bptt, emb_sz=100, nh=200, nl=2)
+
+def tabular_bench_learner(path:PathOrStr, n_items:int=10000, n_cat:int=20, n_cont:int=50, bs:int=256,
+                          num_workers:int=0)->Learner:
+    "A `tabular_learner` on a `TabularDataBunch.from_df` with `n_cat` categorical and `n_cont` continuous random columns."
+    cat_names,cont_names = [f'cat{i}' for i in range(n_cat)],[f'cont{i}' for i in range(n_cont)]
+    df = pd.DataFrame({**{c:np.random.randint(0, 10, n_items).astype(str) for c in cat_names},
+                       **{c:np.random.randn(n_items).astype(np.float32) for c in cont_names},
+                       'target':np.random.randint(0, 2, n_items)})
+    data = TabularDataBunch.from_df(path, df, 'target', valid_idx=range(n_items//5), procs=[Categorify, Normalize],
+                                    cat_names=cat_names, cont_names=cont_names, bs=bs, num_workers=num_workers)
+    return tabular_learner(data, layers=[200,100])
+
+def collab_bench_learner(path:PathOrStr, n_items:int=100000, n_users:int=1000, n_movies:int=1000, bs:int=1024,
+                         num_workers:int=0)->Learner:
+    "A `collab_learner` on a `CollabDataBunch` of `n_items` random ratings of `n_movies` by `n_users`."
+    ratings = pd.DataFrame({'userId':np.random.randint(0, n_users, n_items), 'movieId':np.random.randint(0, n_movies, n_items),
+                            'rating':np.random.randint(1, 11, n_items).astype(np.float32) / 2})
+    series2cat(ratings, 'userId', 'movieId')
+    data = CollabDataBunch.from_df(ratings, seed=0, path=path, bs=bs, num_workers=num_workers)
+    return collab_learner(data, n_factors=50, y_range=(0.,5.5))
+
+_bench_learners = {'vision':vision_bench_learner, 'text_clas':text_clas_bench_learner, 'text_lm':text_lm_bench_learner,
+                   'tabular':tabular_bench_learner, 'collab':collab_bench_learner}
+
+def _n_items(yb:Tensors)->int:
+    "Number of targets in `yb`: the batch size, or the number of tokens for a language model."
+    return len(yb[0] if is_listy(yb) else yb)
+
+def bench_learner(learn:Learner, n_batch:int=20)->Dict[str,float]:
+    "Items/s of `learn` for loading `n_batch` training batches, training steps on them and `get_preds` on `n_batch` validation batches."
+    if not getattr(learn, 'opt', False): learn.create_opt(defaults.lr, learn.wd)
+    batches,n_preds = [],[]
+    def _load(): batches[:] = itertools.islice(learn.data.train_dl, n_batch)
+    load_ms = time_ms(_load, 1)
+    n_train = sum(_n_items(yb) for _,yb in batches)
+    learn.model.train()
+    # The warm-up step (that allocates the optimizer state) takes the first batch, the timed steps then go over all of them.
+    it = itertools.cycle(batches)
+    train_ms = time_ms(lambda: loss_batch(learn.model, *next(it), learn.loss_func, learn.opt), len(batches)) * len(batches)
+    def _preds(): n_preds[:] = [len(learn.get_preds(n_batch=n_batch)[1])]
+    preds_ms = time_ms(_preds, 1)
+    return {'load_items_per_s':n_train / load_ms * 1e3, 'train_items_per_s':n_train / train_ms * 1e3,
+            'preds_items_per_s':n_preds[0] / preds_ms * 1e3}
+
+def _env()->Dict[str,Any]:
+    "Versions, git commit and hardware the benchmarks ran with."
+    cmd = ['git', 'rev-parse', '--short', 'HEAD']
+    try: commit = subprocess.run(cmd, cwd=Path(__file__).parent, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL).stdout.decode().strip()
+    except OSError: commit = ''
+    return {'fastai':__version__, 'torch':torch.__version__, 'commit':commit or None, 'device':str(defaults.device),
+            'threads':torch.get_num_threads(), 'date':time.strftime('%Y-%m-%d %H:%M:%S')}
+
+def bench_apps(apps:Collection[str]=None, n_batch:int=20, path:PathOrStr=None, fname:PathOrStr=None, seed:int=42)->pd.DataFrame:
+    "Run `bench_learner` on the synthetic learners of `apps` (all by default) created in `path` (or a temporary folder), saves the results in the JSON `fname`."
+    res = []
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(ifnone(path, tmp))
+        for app in ifnone(apps, list(_bench_learners.keys())):
+            _seed(seed)
+            res.append({'app':app, **bench_learner(_bench_learners[app](path/app), n_batch)})
+    res = pd.DataFrame(res)
+    if fname is not None:
+        with open(fname, 'w') as f: json.dump({**_env(), 'n_batch':n_batch, 'results':res.to_dict('records')}, f, indent=2)
+    return res
+
+def compare_benchmarks(old_fname:PathOrStr, new_fname:PathOrStr)->pd.DataFrame:
+    "Ratio of the items/s saved by `bench_apps` in `new_fname` over those in `old_fname` (below 1 is a slowdown)."
+    old,new = [pd.DataFrame(json.load(open(f))['results']).set_index('app') for f in (old_fname, new_fname)]
+    return new / old
+
+if __name__ == '__main__': print(bench_apps(fname=sys.argv[1] if len(sys.argv) > 1 else 'bench_apps.json'))
@@ -0,0 +1,41 @@
+"Benchmark the per-batch overhead of `CallbackHandler` dispatch"
+from ..torch_core import *
+from ..callback import *
+from ..callback import _cb_events
+from . import time_ms
+
+__all__ = ['bench_callback_dispatch']
+
+class _BatchEndCallback(Callback):
+    "A callback that only implements `on_batch_end`, like most metrics trackers."
+    def on_batch_end(self, **kwargs:Any)->None: pass
+
+def _fake_batch(cb_handler:CallbackHandler, xb:Tensor, yb:Tensor, loss:Tensor)->None:
+    "Go through all the events of one training batch, like `loss_batch` does."
+    xb,yb = cb_handler.on_batch_begin(xb, yb)
+    out = cb_handler.on_loss_begin(xb)
+    loss = cb_handler.on_backward_begin(loss)
+    cb_handler.on_backward_end()
+    cb_handler.on_step_end()
+    cb_handler.on_batch_end(loss)
+
+def _time_batches(cb_handler:CallbackHandler, n_batch:int)->float:
+    "Time in ms of one fake batch through `cb_handler`."
+    cb_handler.on_train_begin(1, None, [])
+    cb_handler.on_epoch_begin()
+    return time_ms(partial(_fake_batch, cb_handler, torch.zeros(2,2), torch.zeros(2), torch.tensor(0.)), n_batch)
+
+def bench_callback_dispatch(n_cbs:Collection[int]=(0,10,50), n_batch:int=2000)->pd.DataFrame:
+    "Time the dispatch overhead per batch (in microseconds) with `n_cbs` callbacks, with and without the fast path."
+    res = []
+    for n in n_cbs:
+        cbs = [_BatchEndCallback() for _ in range(n)]
+        fast = CallbackHandler(cbs)
+        # Emulate the dispatch to every callback for every event.
+        slow = CallbackHandler(cbs)
+        slow.cb_events = {e:slow.callbacks for e in _cb_events}
+        res.append({'n_callbacks':n, 'all_events_us':_time_batches(slow, n_batch)*1e3,
+                    'fast_path_us':_time_batches(fast, n_batch)*1e3})
+    return pd.DataFrame(res)
+
+if __name__ == '__main__': print(bench_callback_dispatch())
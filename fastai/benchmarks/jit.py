@@ -0,0 +1,31 @@
+"Benchmark the CPU latency of eager against TorchScript models for `create_cnn`, `tabular_learner` and `text_classifier_learner`"
+from ..torch_core import *
+from ..inference import *
+from ..tabular.models import TabularModel
+from ..text.models import get_rnn_classifier
+from .optim import cnn_model
+from . import time_ms
+
+__all__ = ['bench_torchscript', 'inference_models']
+
+def inference_models(bs:int=16)->Dict[str,Tuple[nn.Module,Tensors]]:
+    "The default models of `create_cnn` (resnet34), `tabular_learner` and `text_classifier_learner` with an input batch of size `bs`."
+    tab = TabularModel([(10,6)]*5, 10, 2, [200,100])
+    # Same configuration as `text_classifier_learner` with a vocab of 10k words and sequences of 200 tokens.
+    text = get_rnn_classifier(70, 70*20, 2, 10000, 400, 1150, 3, 1, [1200,50,2], [0.4,0.1])
+    return {'cnn':     (cnn_model(), torch.randn(bs,3,224,224)),
+            'tabular': (tab, [torch.randint(0,10,(bs,5)).long(), torch.randn(bs,10)]),
+            'text':    (text, torch.randint(0,10000,(200,bs)).long())}
+
+def bench_torchscript(bs:int=16, n_iter:int=10)->pd.DataFrame:
+    "Time (in ms) a forward pass of batch size `bs` on the cpu of the eager and traced versions of `inference_models`."
+    res = []
+    for name,(model,xb) in inference_models(bs).items():
+        model.eval()
+        traced,xb = trace_model(model, xb),listify(xb)
+        with torch.no_grad():
+            res.append({'model':name, 'eager_ms':time_ms(partial(model, *xb), n_iter),
+                        'torchscript_ms':time_ms(partial(traced, *xb), n_iter)})
+    return pd.DataFrame(res)
+
+if __name__ == '__main__': print(bench_torchscript())
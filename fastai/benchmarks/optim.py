@@ -0,0 +1,42 @@
+"Benchmark the decoupled weight decay of `OptimWrapper.step` on a resnet34 `create_cnn` model"
+from ..torch_core import *
+from ..callback import *
+from ..vision.learner import cnn_config, create_body, create_head
+from ..vision import models
+from ..callbacks.hooks import num_features_model
+from . import time_ms
+
+__all__ = ['bench_weight_decay', 'cnn_layer_groups', 'cnn_model']
+
+def cnn_model(arch:Callable=models.resnet34, nc:int=10)->nn.Module:
+    "The model `create_cnn` builds for `arch`, with random weights (no download)."
+    body = create_body(arch, pretrained=False)
+    return nn.Sequential(body, create_head(num_features_model(body) * 2, nc))
+
+def cnn_layer_groups(arch:Callable=models.resnet34, nc:int=10)->ModuleList:
+    "Layer groups of the model `create_cnn` builds for `arch`, with random weights (no download)."
+    model = cnn_model(arch, nc)
+    return split_model(model, cnn_config(arch)['split'](model))
+
+def _loop_wd(opt:OptimWrapper)->None:
+    "The previous implementation: one multiplication per parameter and `weight_decay` set at every step."
+    for lr,wd,pg1,pg2 in zip(opt._lr,opt._wd,opt.opt.param_groups[::2],opt.opt.param_groups[1::2]):
+        for p in pg1['params']: p.data.mul_(1 - wd*lr)
+        if opt.bn_wd:
+            for p in pg2['params']: p.data.mul_(1 - wd*lr)
+    opt.set_val('weight_decay', listify(0, opt._wd))
+
+def bench_weight_decay(arch:Callable=models.resnet34, n_iter:int=20, opt_func:Callable=AdamW)->pd.DataFrame:
+    "Time (in ms) the weight decay and full optimizer step of `OptimWrapper` for `arch` with the loop and grouped versions."
+    layer_groups = cnn_layer_groups(arch)
+    opt = OptimWrapper.create(opt_func, [1e-3]*len(layer_groups), layer_groups, wd=1e-2, true_wd=True)
+    for p in opt.opt.param_groups:
+        for t in p['params']: t.grad = torch.zeros_like(t)
+    def _loop_step():
+        _loop_wd(opt)
+        opt.opt.step()
+    res = [{'version':'loop',    'wd_ms':time_ms(partial(_loop_wd, opt), n_iter), 'step_ms':time_ms(_loop_step, n_iter)},
+           {'version':'grouped', 'wd_ms':time_ms(opt.apply_wd, n_iter),           'step_ms':time_ms(opt.step, n_iter)}]
+    return pd.DataFrame(res)
+
+if __name__ == '__main__': print(bench_weight_decay())
@@ -0,0 +1,46 @@
+"Load generator for `fastai.serve`: latency and throughput of an MLP served on localhost under concurrent clients"
+from ..torch_core import *
+from ..serve import *
+from ..serve import _read_http, _http_message
+from .predict import mlp_learner
+
+__all__ = ['bench_serve']
+
+async def _client(port:int, items:Collection[list], latencies:List[float])->None:
+    "Send `items` one after the other on one keep-alive connection to localhost:`port`, record their latencies."
+    reader,writer = await asyncio.open_connection('127.0.0.1', port)
+    for item in items:
+        start = time.perf_counter()
+        writer.write(_http_message('POST /predict HTTP/1.1', json.dumps({'item':item}).encode()))
+        await writer.drain()
+        _,status,_,body = await _read_http(reader)
+        assert status == '200', body
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+async def _load(server:InferenceServer, n_clients:int, n_requests:int, n_in:int)->dict:
+    items = np.random.randn(n_requests, n_in).astype(np.float32).tolist()
+    latencies = []
+    server.reset_stats()
+    start = time.perf_counter()
+    await asyncio.gather(*[_client(server.port, items[i::n_clients], latencies) for i in range(n_clients)])
+    elapsed = time.perf_counter() - start
+    lat = np.array(latencies) * 1e3
+    return {'clients':n_clients, 'requests_per_s':n_requests/elapsed, 'p50_ms':np.percentile(lat, 50),
+            'p99_ms':np.percentile(lat, 99), 'mean_bs':server.stats()['mean_bs']}
+
+def bench_serve(n_clients:Collection[int]=(1,8,32), n_requests:int=512, max_bs:int=64, max_wait_ms:float=5.,
+                n_in:int=100)->pd.DataFrame:
+    "Client-side latency and throughput of `n_requests` sent by each number of concurrent clients in `n_clients`."
+    server = InferenceServer(mlp_learner(n_in=n_in), max_bs=max_bs, max_wait_ms=max_wait_ms,
+                             item_fn=partial(np.array, dtype=np.float32))
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        loop.run_until_complete(server.start(port=0))
+        res = [loop.run_until_complete(_load(server, n, n_requests, n_in)) for n in n_clients]
+        loop.run_until_complete(server.stop())
+    finally: loop.close()
+    return pd.DataFrame(res)
+
+if __name__ == '__main__': print(bench_serve())
@@ -0,0 +1,34 @@
+"Benchmark the loading of a `TabularDataBunch` item by item against whole batches sliced from its arrays"
+from ..torch_core import *
+from ..tabular import *
+
+__all__ = ['bench_tabular_loading']
+
+def _rows_per_s(dl:DeviceDataLoader, n_batch:int)->float:
+    "Rows/s of the first `n_batch` batches of `dl`."
+    n,start = 0,time.perf_counter()
+    for _,yb in itertools.islice(dl, n_batch): n += len(yb)
+    return n / (time.perf_counter() - start)
+
+def bench_tabular_loading(n_rows:int=100000, n_cat:int=20, n_cont:int=50, bs:int=1024, n_batch:int=50)->pd.DataFrame:
+    "Rows/s of loading `n_batch` batches of `n_rows` random rows item by item and with `batch_fetch`, against the `TabularModel` forward pass."
+    cat_names,cont_names = [f'cat{i}' for i in range(n_cat)],[f'cont{i}' for i in range(n_cont)]
+    df = pd.DataFrame({**{c:np.random.randint(0, 10, n_rows).astype(str) for c in cat_names},
+                       **{c:np.random.randn(n_rows).astype(np.float32) for c in cont_names},
+                       'target':np.random.randint(0, 2, n_rows)})
+    src = (TabularList.from_df(df, cat_names=cat_names, cont_names=cont_names, procs=[Categorify, Normalize])
+           .split_by_idx(range(bs)).label_from_df(cols='target'))
+    res = []
+    for batch_fetch in (False, True):
+        data = src.databunch(bs=bs, num_workers=0, batch_fetch=batch_fetch)
+        res.append({'mode':'batch_fetch' if batch_fetch else 'per_item', 'rows_per_s':_rows_per_s(data.train_dl, n_batch)})
+    model = tabular_learner(data, layers=[200,100]).model.eval()
+    batches = list(itertools.islice(data.train_dl, n_batch))
+    with torch.no_grad():
+        start = time.perf_counter()
+        for xb,_ in batches: model(*xb)
+        if torch.cuda.is_available(): torch.cuda.synchronize()
+    res.append({'mode':'model_forward', 'rows_per_s':sum(len(yb) for _,yb in batches) / (time.perf_counter() - start)})
+    return pd.DataFrame(res)
+
+if __name__ == '__main__': print(bench_tabular_loading())
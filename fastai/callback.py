@@ -3,7 +3,12 @@ from .basic_data import *
 from .torch_core import *
 
 __all__ = ['AverageMetric', 'Callback', 'CallbackHandler', 'OptimWrapper', 'SmoothenValue', 'Stepper', 'annealing_cos', 'CallbackList',
-           'annealing_exp', 'annealing_linear', 'annealing_no', 'annealing_poly']
+           'annealing_exp', 'annealing_linear', 'annealing_no', 'annealing_poly', 'has_event']
+
+def _in_buffer(t:Tensor, buf:Tensor)->bool:
+    "Whether the data of `t` lies in the memory of `buf`."
+    start = buf.data_ptr()
+    return t.device == buf.device and start <= t.data_ptr() < start + buf.numel() * buf.element_size()
 
 class OptimWrapper():
     "Basic wrapper around `opt` to simplify hyper-parameters changes."
@@ -16,20 +21,22 @@ class OptimWrapper():
 
     @classmethod
     def create(cls, opt_func:Union[type,Callable], lr:Union[float,Tuple,List],
-               layer_groups:ModuleList, **kwargs:Any)->optim.Optimizer:
-        "Create an `optim.Optimizer` from `opt_func` with `lr`. Set lr on `layer_groups`."
+               layer_groups:ModuleList, flat_params:bool=False, **kwargs:Any)->optim.Optimizer:
+        "Create an `optim.Optimizer` from `opt_func` with `lr`. Set lr on `layer_groups`, with contiguous params if `flat_params`."
         split_groups = split_bn_bias(layer_groups)
-        opt = opt_func([{'params': trainable_params(l), 'lr':0} for l in split_groups])
+        model_params = [trainable_params(l) for l in split_groups]
+        params = [flatten_params(ps) for ps in model_params] if flat_params else model_params
+        opt = opt_func([{'params': ps, 'lr':0} for ps in params])
         opt = cls(opt, **kwargs)
-        opt.lr,opt.opt_func = listify(lr, layer_groups),opt_func
+        opt.lr,opt.opt_func,opt.flat_params = listify(lr, layer_groups),opt_func,flat_params
+        if flat_params: opt.model_params = model_params
         return opt
-    
+
     def new(self, layer_groups:ModuleList):
         "Create a new `OptimWrapper` from `self` with another `layer_groups` but the same hyper-parameters."
         opt_func = getattr(self, 'opt_func', self.opt.__class__)
-        split_groups = split_bn_bias(layer_groups)
-        opt = opt_func([{'params': trainable_params(l), 'lr':0} for l in split_groups])
-        return self.create(opt_func, self.lr, layer_groups, wd=self.wd, true_wd=self.true_wd, bn_wd=self.bn_wd)
+        return self.create(opt_func, self.lr, layer_groups, flat_params=bool(self.flat_params), wd=self.wd,
+                           true_wd=self.true_wd, bn_wd=self.bn_wd)
 
     def __repr__(self)->str:
         return f'OptimWrapper over {repr(self.opt)}.\nTrue weight decay: {self.true_wd}'
@@ -37,18 +44,47 @@ class OptimWrapper():
     #Pytorch optimizer methods
     def step(self)->None:
         "Set weight decay and step optimizer."
+        if self.flat_params: self.relink_flat()
         # weight decay outside of optimizer step (AdamW)
         if self.true_wd:
-            for lr,wd,pg1,pg2 in zip(self._lr,self._wd,self.opt.param_groups[::2],self.opt.param_groups[1::2]):
-                for p in pg1['params']: p.data.mul_(1 - wd*lr)
-                if self.bn_wd:
-                    for p in pg2['params']: p.data.mul_(1 - wd*lr)
-            self.set_val('weight_decay', listify(0, self._wd))
+            self.apply_wd()
+            if any(pg.get('weight_decay', 0) != 0 for pg in self.opt.param_groups):
+                self.set_val('weight_decay', listify(0, self._wd))
         self.opt.step()
 
+    def apply_wd(self)->None:
+        "Apply decoupled weight decay, with one grouped operation per layer group."
+        with torch.no_grad():
+            for lr,wd,pg1,pg2 in zip(self._lr,self._wd,self.opt.param_groups[::2],self.opt.param_groups[1::2]):
+                if wd*lr == 0: continue
+                ps = pg1['params'] + pg2['params'] if self.bn_wd else pg1['params']
+                if len(ps) != 0: foreach_mul_(ps, 1 - wd*lr)
+
+    def relink_flat(self)->None:
+        "Flatten again the groups whose parameters were moved out of their flat buffer (by `.to`, `.half`...), keeping their state."
+        for pg,ps in zip(self.opt.param_groups, self.model_params):
+            if len(pg['params']) != 1 or pg['params'][0] is ps[0]: continue
+            flat = pg['params'][0]
+            if all(_in_buffer(p, flat) for p in ps): continue
+            pg['params'] = flatten_params(ps)
+            state = self.opt.state.pop(flat, None)
+            if state is None or len(pg['params']) != 1: continue
+            new_flat = pg['params'][0]
+            self.opt.state[new_flat] = {k:(v.to(new_flat) if isinstance(v, Tensor) and v.shape == flat.shape else v)
+                                        for k,v in state.items()}
+
     def zero_grad(self)->None:
         "Clear optimizer gradients."
-        self.opt.zero_grad()
+        if not self.flat_params: return self.opt.zero_grad()
+        # The flat gradients need to stay allocated since the gradients of the model are views of them.
+        for pg in self.opt.param_groups:
+            for p in pg['params']:
+                if p.grad is not None: p.grad.zero_()
+
+    @property
+    def params(self)->ParamList:
+        "All the parameters optimized, one flat tensor per group if `flat_params`."
+        return [p for pg in self.opt.param_groups for p in pg['params']]
         
     #Passthrough to the inner opt.
     def __getattr__(self,k:str)->Any: return getattr(self.opt, k, None)
@@ -151,6 +187,13 @@ class Callback():
         "Useful for cleaning up things and saving files/models."
         pass
 
+    def get_state(self)->dict:
+        "Return a snapshot of the inner state needed to resume training from a checkpoint."
+        return {}
+    def load_state(self, state:dict)->None:
+        "Restore the inner state returned by `get_state` when resuming training."
+        self.__dict__.update(state)
+
 class SmoothenValue():
     "Create a smooth moving average for a value (loss, etc) using `beta`."
     def __init__(self, beta:float):
@@ -164,14 +207,27 @@ class SmoothenValue():
 
 CallbackList = Collection[Callback]
 
+_cb_events = ['train_begin', 'epoch_begin', 'batch_begin', 'loss_begin', 'backward_begin', 'backward_end', 'step_end',
+              'batch_end', 'epoch_end', 'train_end']
+
 def _get_init_state(): return {'epoch':0, 'iteration':0, 'num_batch':0}
 
+def has_event(cb:Callback, cb_name:str)->bool:
+    "Check if `cb` implements the event `cb_name` instead of inheriting the no-op from `Callback`."
+    name = f'on_{cb_name}'
+    return name in getattr(cb, '__dict__', {}) or getattr(type(cb), name, None) is not getattr(Callback, name)
+
+def _events_dict(cbs:CallbackList)->Dict[str,CallbackList]:
+    return {e:[cb for cb in cbs if has_event(cb, e)] for e in _cb_events}
+
 @dataclass
 class CallbackHandler():
-    "Manage all of the registered `callbacks` and `metrics`, smoothing loss by momentum `beta`."
+    "Manage all of the registered `callbacks` and `metrics`, smoothing loss by momentum `beta`, syncing every `sync_every` batches."
     callbacks:CallbackList=None
     metrics:CallbackList=None
     beta:float=0.98
+    sync_every:int=1
+    n_accum:int=1
 
     def __post_init__(self)->None:
         "Initialize smoother and learning stats."
@@ -181,30 +237,82 @@ class CallbackHandler():
         self.callbacks = sorted(self.callbacks, key=lambda o: getattr(o, '_order', 0))
         self.smoothener = SmoothenValue(self.beta)
         self.state_dict:Dict[str,Union[int,float,Tensor]]=_get_init_state()
+        # Only dispatch an event to the callbacks and metrics that implement it.
+        self.cb_events,self.met_events = _events_dict(self.callbacks),_events_dict(self.metrics)
 
     def __call__(self, cb_name, call_mets=True, **kwargs)->None:
         "Call through to all of the `CallbakHandler` functions."
-        if call_mets: [getattr(met, f'on_{cb_name}')(**self.state_dict, **kwargs) for met in self.metrics]
-        return [getattr(cb, f'on_{cb_name}')(**self.state_dict, **kwargs) for cb in self.callbacks]
+        if call_mets: [getattr(met, f'on_{cb_name}')(**self.state_dict, **kwargs) for met in self.met_events[cb_name]]
+        return [getattr(cb, f'on_{cb_name}')(**self.state_dict, **kwargs) for cb in self.cb_events[cb_name]]
 
-    def on_train_begin(self, epochs:int, pbar:PBar, metrics:MetricFuncList)->None:
+    @property
+    def deferred_sync(self)->bool:
+        "Whether losses and metrics are kept on the device between syncs."
+        return self.sync_every > 1
+
+    def is_sync_batch(self, train:bool=True)->bool:
+        "Whether the values computed during the current batch should be copied to the host."
+        if not train or not self.deferred_sync: return True
+        return (self.state_dict['iteration']+1) % self.sync_every == 0
+
+    def is_step_batch(self, train:bool=True)->bool:
+        "Whether the optimizer steps at the end of the current batch, when gradients are accumulated over `n_accum` batches."
+        if not train or self.n_accum <= 1: return True
+        num_batch = self.state_dict['num_batch']+1
+        return num_batch % self.n_accum == 0 or num_batch == self.state_dict.get('epoch_len')
+
+    def accum_size(self, train:bool=True)->int:
+        "Number of batches whose gradients are accumulated with the current one, smaller for the last group of an epoch."
+        if not train or self.n_accum <= 1: return 1
+        group_start = self.state_dict['num_batch'] // self.n_accum * self.n_accum
+        epoch_len = self.state_dict.get('epoch_len')
+        return self.n_accum if epoch_len is None else max(1, min(self.n_accum, epoch_len - group_start))
+
+    def on_train_begin(self, epochs:int, pbar:PBar, metrics:MetricFuncList, epoch_len:int=None)->None:
         "About to start learning."
         self.state_dict = _get_init_state()
         self.state_dict['n_epochs'],self.state_dict['pbar'],self.state_dict['metrics'] = epochs,pbar,metrics
+        self.state_dict['epoch_len'],self.state_dict['n_accum'] = epoch_len,self.n_accum
+        self.start_batch,self.epoch_rng = 0,None
         names = [(met.name if hasattr(met, 'name') else camel2snake(met.__class__.__name__)) for met in self.metrics]
-        self('train_begin', metrics_names=names)
+        self('train_begin', metrics_names=names, cb_handler=self)
+
+    def stateful_callbacks(self)->Dict[str,Callback]:
+        "The callbacks implementing `get_state`, keyed by their position among them and class name."
+        cbs = [cb for cb in self.callbacks if getattr(type(cb), 'get_state', None) is not Callback.get_state]
+        return {f'{i}_{cb.__class__.__name__}':cb for i,cb in enumerate(cbs)}
+
+    def get_state(self)->dict:
+        "Return the training counters, loss smoothener and inner states of the callbacks, to save in a checkpoint."
+        return {'counters': {k:self.state_dict[k] for k in ('epoch', 'iteration', 'num_batch')},
+                'smoothener': (self.smoothener.mov_avg, self.smoothener.n), 'epoch_rng': self.epoch_rng,
+                'callbacks': {k:cb.get_state() for k,cb in self.stateful_callbacks().items()}}
+
+    def load_state(self, state:dict)->None:
+        "Restore the training state returned by `get_state`, the next epoch then starts after the batches already done."
+        cbs = self.stateful_callbacks()
+        if list(cbs) != list(state['callbacks']):
+            raise ValueError(f"The callbacks with a state {list(cbs)} don't match the ones saved {list(state['callbacks'])}.")
+        self.state_dict.update(state['counters'])
+        self.start_batch,self.epoch_rng = state['counters']['num_batch'],state['epoch_rng']
+        self.smoothener.mov_avg,self.smoothener.n = state['smoothener']
+        for k,cb in cbs.items():
+            if state['callbacks'][k]: cb.load_state(state['callbacks'][k])
 
     def on_epoch_begin(self)->None:
         "Handle new epoch."
-        self.state_dict['num_batch'] = 0
+        self.state_dict['num_batch'],self.start_batch = self.start_batch,0
         self('epoch_begin')
+        # The batches of the epoch are drawn from this state, replayed when resuming in the middle of it.
+        if self.state_dict['num_batch'] == 0: self.epoch_rng = rng_states()
 
     def on_batch_begin(self, xb:Tensor, yb:Tensor, train:bool=True)->None:
         "Handle new batch `xb`,`yb` in `train` or validation."
         self.state_dict['last_input'], self.state_dict['last_target'] = xb, yb
         self.state_dict['train'] = train
-        cbs = self.callbacks if train else self.metrics + self.callbacks
-        for cb in self.callbacks:
+        self.state_dict['sync_batch'] = self.is_sync_batch(train)
+        self.state_dict['step_batch'] = self.is_step_batch(train)
+        for cb in self.cb_events['batch_begin']:
             a = cb.on_batch_begin(**self.state_dict)
             if a is not None: self.state_dict['last_input'], self.state_dict['last_target'] = a
         return self.state_dict['last_input'], self.state_dict['last_target']
@@ -212,23 +320,25 @@ class CallbackHandler():
     def on_loss_begin(self, out:Tensor)->None:
         "Handle start of loss calculation with model output `out`."
         self.state_dict['last_output'] = out
-        for cb in self.callbacks:
+        for cb in self.cb_events['loss_begin']:
             a = cb.on_loss_begin(**self.state_dict)
             if a is not None: self.state_dict['last_output'] = a
         return self.state_dict['last_output']
 
     def on_backward_begin(self, loss:Tensor)->None:
         "Handle gradient calculation on `loss`."
-        self.smoothener.add_value(loss.detach().cpu())
-        self.state_dict['last_loss'], self.state_dict['smooth_loss'] = loss, self.smoothener.smooth
-        for cb in self.callbacks:
+        self.smoothener.add_value(loss.detach() if self.deferred_sync else loss.detach().cpu())
+        smooth = self.smoothener.smooth
+        if self.deferred_sync and self.state_dict['sync_batch']: smooth = smooth.cpu()
+        self.state_dict['last_loss'], self.state_dict['smooth_loss'] = loss, smooth
+        for cb in self.cb_events['backward_begin']:
             a = cb.on_backward_begin(**self.state_dict)
             if a is not None: self.state_dict['last_loss'] = a
         return self.state_dict['last_loss']
 
-    def on_backward_end(self)->None:
-        "Handle end of gradient calculation."
-        self('backward_end', False)
+    def on_backward_end(self)->bool:
+        "Handle end of gradient calculation, return `True` if a callback asks to skip the optimizer step."
+        return np.any(self('backward_end', False))
     def on_step_end(self)->None:
         "Handle end of optimization step."
         self('step_end', False)
@@ -245,6 +355,7 @@ class CallbackHandler():
     def on_epoch_end(self, val_loss:Tensor)->bool:
         "Epoch is done, process `val_loss`."
         self.state_dict['last_metrics'] = [val_loss] if val_loss is not None else None
+        if 'smooth_loss' in self.state_dict: self.state_dict['smooth_loss'] = to_cpu(self.state_dict['smooth_loss'])
         self.state_dict['epoch'] += 1
         if not self.state_dict['train']:
             for met in self.metrics:
@@ -271,11 +382,11 @@ class AverageMetric(Callback):
         "Update metric computation with `last_output` and `last_target`."
         if not is_listy(last_target): last_target=[last_target]
         self.count += last_target[0].size(0)
-        self.val += last_target[0].size(0) * self.func(last_output, *last_target).detach().cpu()
+        self.val += last_target[0].size(0) * self.func(last_output, *last_target).detach()
 
     def on_epoch_end(self, **kwargs):
         "Sets the final result in `self.metric`."
-        self.metric = self.val/self.count
+        self.metric = to_cpu(self.val/self.count)
 
 def annealing_no(start:Number, end:Number, pct:float)->Number:
     "No annealing, always return `start`."
@@ -310,6 +421,11 @@ class Stepper():
     def step(self)->Number:
         "Return next value along annealed schedule."
         self.n += 1
+        return self.val
+
+    @property
+    def val(self)->Number:
+        "Return the current value along annealed schedule."
         return self.func(self.start, self.end, self.n/self.n_iter)
 
     @property
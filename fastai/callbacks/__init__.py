@@ -7,4 +7,7 @@ from .mixup import *
 from .rnn import *
 from .tracker import *
 from .csv_logger import *
+from .profiler import *
+from .json_logger import *
+from .checkpoint import *
 from .loss_metrics import *
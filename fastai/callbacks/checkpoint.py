@@ -0,0 +1,88 @@
+"Save the full training state in the background to resume an interrupted training"
+from ..torch_core import *
+from ..callback import *
+from ..basic_train import Learner, LearnerCallback
+
+__all__ = ['CheckpointCallback', 'resume']
+
+def _copy_to_cpu(o:Any)->Any:
+    "Recursively copy the tensors in `o` to the cpu so they don't change while training goes on."
+    if isinstance(o, Tensor): return o.detach().to('cpu', copy=True)
+    if isinstance(o, dict): return {k:_copy_to_cpu(v) for k,v in o.items()}
+    if isinstance(o, (list,tuple)): return type(o)(_copy_to_cpu(v) for v in o)
+    return o
+
+def _checkpoints(path:Path, name:str)->List[Path]:
+    "Checkpoints saved with `name` in `path`, from the oldest to the most recent."
+    fnames = [f for f in path.glob(f'{name}_*.pth') if f.stem[len(name)+1:].isdigit()]
+    return sorted(fnames, key=lambda f: int(f.stem[len(name)+1:]))
+
+@dataclass
+class CheckpointCallback(LearnerCallback):
+    "Save the full training state of `learn` every `every` iterations in a background thread, keeping the last `keep`."
+    _order=-30 # Needs to run before any other callback of the batch.
+    every:int=500
+    name:str='checkpoint'
+    keep:int=2
+
+    def on_train_begin(self, cb_handler:CallbackHandler, **kwargs:Any)->None:
+        "Start the thread writing the checkpoints."
+        self.cb_handler,self.last_iter,self.error = cb_handler,None,None
+        self.queue = queue.Queue(maxsize=1)
+        self.thread = threading.Thread(target=self._writer, daemon=True)
+        self.thread.start()
+
+    def on_batch_begin(self, train:bool, iteration:int, num_batch:int, n_accum:int=1, **kwargs:Any)->None:
+        "Checkpoint the state reached after the previous batch, if `every` iterations have passed since the last one."
+        if not train: return
+        if self.last_iter is None: self.last_iter = iteration
+        # Gradients accumulated over several batches are not saved, so only checkpoint right after an optimizer step.
+        if iteration - self.last_iter < self.every or num_batch % n_accum != 0: return
+        self.last_iter = iteration
+        self.save(f'{self.name}_{iteration}')
+
+    def on_train_end(self, **kwargs:Any)->None:
+        "Wait for the last checkpoint to be written."
+        self.queue.put(None)
+        self.thread.join()
+        if self.error is not None: warn(f'Saving a checkpoint failed: {self.error}')
+
+    def get_train_state(self)->dict:
+        "Copy of the model, optimizer, callbacks and counters of the training and of the random states."
+        return {'model':_copy_to_cpu(self.learn.model.state_dict()), 'opt':_copy_to_cpu(self.learn.opt.state_dict()),
+                'train':self.cb_handler.get_state(), 'rng':rng_states()}
+
+    def save(self, name:str)->None:
+        "Queue the current training state to be saved in `name`, waits if the previous one isn't written yet."
+        self.queue.put((self.learn.path/self.learn.model_dir/f'{name}.pth', self.get_train_state()))
+
+    def _writer(self)->None:
+        "Write the queued states with an atomic rename, then remove the older checkpoints."
+        while True:
+            item = self.queue.get()
+            if item is None: return
+            fname,state = item
+            try:
+                tmp = fname.with_name(f'{fname.name}.tmp')
+                torch.save(state, tmp)
+                os.replace(tmp, fname)
+                for f in _checkpoints(fname.parent, self.name)[:-self.keep]: f.unlink()
+            except Exception as e: self.error = e
+
+def resume(learn:Learner, name:str='checkpoint')->Learner:
+    "Restore the training state saved in `name`, or the last checkpoint saved with `name`. The next `fit` continues from it."
+    path = learn.path/learn.model_dir
+    fname = path/f'{name}.pth'
+    if not fname.is_file():
+        ckpts = _checkpoints(path, name)
+        if len(ckpts) == 0: raise FileNotFoundError(f'No checkpoint {name} found in {path}.')
+        fname = ckpts[-1]
+    state = torch.load(fname, map_location='cpu')
+    learn.model.load_state_dict(state['model'])
+    if not getattr(learn, 'opt', False): learn.create_opt(defaults.lr, learn.wd)
+    learn.opt.load_state_dict(state['opt'])
+    set_rng_states(state['rng'])
+    learn.resume_state = state['train']
+    return learn
+
+Learner.resume = resume
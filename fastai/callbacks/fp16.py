@@ -5,7 +5,7 @@ from ..basic_train import *
 from torch._utils import _unflatten_dense_tensors
 from torch.nn.utils import parameters_to_vector
 
-__all__ = ['MixedPrecision']
+__all__ = ['MixedPrecision', 'grad_overflow']
 
 def get_master(layer_groups:ModuleList, flat_master:bool=False) -> Tuple[List[List[Tensor]], List[List[Tensor]]]:
     "Return two lists, one for the model parameters in FP16 and one for the master parameters in FP32."
@@ -52,16 +52,31 @@ def master2model(model_params:Sequence[Tensor], master_params:Sequence[Tensor],
         for model_group,master_group in zip(model_params,master_params):
             for model, master in zip(model_group, master_group): model.data.copy_(master.data)
 
+def grad_overflow(param_groups:Collection[Collection[Tensor]])->bool:
+    "Check if the gradients of `param_groups` contain inf or NaN values."
+    # One sum for all the gradients so there is only one synchronization with the GPU.
+    grads = [p.grad.float().sum() for group in param_groups for p in group if p.grad is not None]
+    if len(grads) == 0: return False
+    s = torch.stack(grads).sum().item()
+    return s in (float('inf'), -float('inf')) or s != s
+
 @dataclass
 class MixedPrecision(Callback):
-    "Callback that handles mixed-precision training."
+    "Callback that handles mixed-precision training, with a `dynamic` loss scale growing after `max_noskip` steps without overflow."
     learn:Learner
-    loss_scale:float=512.
+    loss_scale:float=None
     flat_master:bool=False
-    def __post_init__(self): assert torch.backends.cudnn.enabled, "Mixed precision training requires cudnn."
+    dynamic:bool=True
+    max_noskip:int=1000
+    max_scale:float=2.**24
+    def __post_init__(self):
+        self.loss_scale = ifnone(self.loss_scale, 2.**16 if self.dynamic else 512.)
+        self.noskip = 0
 
     def on_train_begin(self, **kwargs:Any)->None:
         "Ensure everything is in half precision mode."
+        if self.learn.data.device.type == 'cuda': assert torch.backends.cudnn.enabled, "Mixed precision training requires cudnn."
+        self.learn.recorder.loss_scales = ValueHistory(self.learn.recorder.max_len)
         self.learn.data.train_dl.add_tfm(to_half)
         if hasattr(self.learn.data, 'valid_dl') and self.learn.data.valid_dl is not None:
             self.learn.data.valid_dl.add_tfm(to_half)
@@ -92,11 +107,21 @@ class MixedPrecision(Callback):
         #To avoid gradient underflow, we scale the gradients
         return last_loss * self.loss_scale
 
-    def on_backward_end(self, **kwargs:Any ):
-        "Convert the gradients back to FP32 and divide them by the scale."
+    def on_backward_end(self, **kwargs:Any)->bool:
+        "Convert the gradients back to FP32 and divide them by the scale, skip the step if they overflowed when `dynamic`."
         model_g2master_g(self.model_params, self.master_params, self.flat_master)
+        self.learn.recorder.loss_scales.append(self.loss_scale)
+        if self.dynamic and grad_overflow(self.master_params):
+            # The model gradients are still zeroed in `on_step_end`.
+            self.loss_scale,self.noskip = self.loss_scale/2,0
+            return True
         for group in self.master_params:
             for param in group: param.grad.div_(self.loss_scale)
+        if self.dynamic:
+            self.noskip += 1
+            if self.noskip >= self.max_noskip and self.loss_scale < self.max_scale:
+                self.loss_scale,self.noskip = self.loss_scale*2,0
+        return False
 
     def on_step_end(self, **kwargs:Any)->None:
         "Update the params from master to model and zero grad."
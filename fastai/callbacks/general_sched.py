@@ -31,11 +31,22 @@ class GeneralScheduler(Callback):
         self.opt.lr,self.opt.mom = self.lr_scheds[0].start,self.mom_scheds[0].start
         self.idx_s = 0
 
-    def on_batch_end(self, train, **kwargs:Any)->None:
+    def on_batch_end(self, train, step_batch:bool=True, **kwargs:Any)->None:
         "Take a step in lr,mom sched, start next stepper when the current one is complete."
-        if train:
+        if train and step_batch:
             if self.idx_s >= len(self.lr_scheds): return True
             self.opt.lr = self.lr_scheds[self.idx_s].step()
             self.opt.mom = self.mom_scheds[self.idx_s].step()
             if self.lr_scheds[self.idx_s].is_done:
-                self.idx_s += 1
\ No newline at end of file
+                self.idx_s += 1
+
+    def get_state(self)->dict:
+        "Return the position in the schedules."
+        return {'idx_s':self.idx_s, 'n':[s.n for s in self.lr_scheds]}
+
+    def load_state(self, state:dict)->None:
+        "Move back to the position `state` in the schedules."
+        self.idx_s = state['idx_s']
+        for lr_s,mom_s,n in zip(self.lr_scheds, self.mom_scheds, state['n']): lr_s.n,mom_s.n = n,n
+        if self.idx_s < len(self.lr_scheds):
+            self.opt.lr,self.opt.mom = self.lr_scheds[self.idx_s].val,self.mom_scheds[self.idx_s].val
@@ -0,0 +1,72 @@
+"A `Callback` that streams training records as JSON lines, for headless training"
+from ..torch_core import *
+from ..callback import *
+from ..basic_train import Learner, LearnerCallback
+
+__all__ = ['JSONLogger', 'headless']
+
+def _to_float(v:Any)->Optional[float]: return None if v is None else float(v)
+
+@dataclass
+class JSONLogger(LearnerCallback):
+    "Write one JSON record per line for the training of `learn` in `filename`.jsonl (stdout if `None`), at most every `every` seconds and after each epoch."
+    filename:Optional[str]='history'
+    every:float=10.
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.path = None if self.filename is None else self.learn.path/f'{self.filename}.jsonl'
+
+    def write(self, record:dict)->None:
+        "Write `record` on its own line."
+        self.file.write(json.dumps(record) + '\n')
+        self.file.flush()
+
+    def on_train_begin(self, **kwargs:Any)->None:
+        "Open the file."
+        if self.path is None: self.file = sys.stdout
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self.file = self.path.open('a')
+
+    def on_epoch_begin(self, **kwargs:Any)->None:
+        "Reset the counters of the throughput and data-wait time."
+        self.last = self.batch_end = time.perf_counter()
+        self.n_items,self.wait = 0,0.
+
+    def on_batch_begin(self, last_target:Tensors, train:bool, **kwargs:Any)->None:
+        "Account the time since the end of the previous batch to waiting for the data."
+        if not train: return
+        self.wait += time.perf_counter() - self.batch_end
+        self.n_items += len(last_target[0] if is_listy(last_target) else last_target)
+
+    def on_batch_end(self, epoch:int, iteration:int, smooth_loss:Tensor, train:bool, sync_batch:bool=True,
+                     **kwargs:Any)->None:
+        "Write a record if `every` seconds have passed since the last one."
+        if not train: return
+        self.batch_end = time.perf_counter()
+        elapsed = self.batch_end - self.last
+        # Waits for a batch where the loss is on the host when losses are synced every few batches.
+        if elapsed < self.every or not sync_batch: return
+        self.write({'type':'batch', 'time':time.time(), 'epoch':epoch, 'iteration':iteration,
+                    'smooth_loss':_to_float(smooth_loss), 'lr':_to_float(self.learn.opt.lr),
+                    'items_per_s':self.n_items/elapsed, 'data_wait':self.wait/elapsed})
+        self.last,self.n_items,self.wait = self.batch_end,0,0.
+
+    def on_epoch_end(self, epoch:int, iteration:int, smooth_loss:Tensor, last_metrics:MetricsList, **kwargs:Any)->None:
+        "Write a record with the losses and metrics of the epoch."
+        stats = [smooth_loss] + ifnone(last_metrics, [])
+        self.write({'type':'epoch', 'time':time.time(), 'epoch':epoch, 'iteration':iteration,
+                    **{name:_to_float(stat) for name,stat in zip(self.learn.recorder.names[1:], stats)}})
+
+    def on_train_end(self, **kwargs:Any)->None:
+        "Close the file."
+        if self.file is not sys.stdout: self.file.close()
+
+def headless(learn:Learner, filename:Optional[str]=None, every:float=10.)->Learner:
+    "Turn off the progress bars of `learn` and stream JSON records of its training in `filename` (stdout if `None`)."
+    learn.no_bar = True
+    learn.callback_fns.append(partial(JSONLogger, filename=filename, every=every))
+    return learn
+
+Learner.headless = headless
@@ -25,9 +25,10 @@ class LRFinder(LearnerCallback):
         self.opt.lr = self.sched.start
         self.stop,self.best_loss = False,0.
 
-    def on_batch_end(self, iteration:int, smooth_loss:TensorOrNumber, **kwargs:Any)->None:
+    def on_batch_end(self, iteration:int, smooth_loss:TensorOrNumber, step_batch:bool=True, **kwargs:Any)->None:
         "Determine if loss has runaway and we should stop."
         if iteration==0 or smooth_loss < self.best_loss: self.best_loss = smooth_loss
+        if not step_batch: return
         self.opt.lr = self.sched.step()
         if self.sched.is_done or (self.stop_div and (smooth_loss > 4*self.best_loss or torch.isnan(smooth_loss))):
             #We use the smoothed loss to decide on the stopping since it's less shaky.
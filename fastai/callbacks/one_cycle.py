@@ -23,9 +23,9 @@ class OneCycleScheduler(Callback):
         return [Stepper(step, n_iter, func=func)
                 for (step,(n_iter,func)) in zip(steps_cfg, self.phases)]
 
-    def on_train_begin(self, n_epochs:int, **kwargs:Any)->None:
+    def on_train_begin(self, n_epochs:int, n_accum:int=1, **kwargs:Any)->None:
         "Initialize our optimization params based on our annealing schedule."
-        n = len(self.learn.data.train_dl) * n_epochs
+        n = math.ceil(len(self.learn.data.train_dl) / n_accum) * n_epochs
         a1 = int(n * self.pct_start)
         a2 = n-a1
         self.phases = ((a1, annealing_cos), (a2, annealing_cos))
@@ -36,9 +36,9 @@ class OneCycleScheduler(Callback):
         self.opt.lr,self.opt.mom = self.lr_scheds[0].start,self.mom_scheds[0].start
         self.idx_s = 0
 
-    def on_batch_end(self, train, **kwargs:Any)->None:
+    def on_batch_end(self, train, step_batch:bool=True, **kwargs:Any)->None:
         "Take one step forward on the annealing schedule for the optim params."
-        if train:
+        if train and step_batch:
             if self.idx_s >= len(self.lr_scheds): return True
             self.opt.lr = self.lr_scheds[self.idx_s].step()
             self.opt.mom = self.mom_scheds[self.idx_s].step()
@@ -46,3 +46,14 @@ class OneCycleScheduler(Callback):
             # schedule. (in 1-cycle there are two schedules)
             if self.lr_scheds[self.idx_s].is_done:
                 self.idx_s += 1
+
+    def get_state(self)->dict:
+        "Return the position in the schedules."
+        return {'idx_s':self.idx_s, 'n':[s.n for s in self.lr_scheds]}
+
+    def load_state(self, state:dict)->None:
+        "Move back to the position `state` in the schedules."
+        self.idx_s = state['idx_s']
+        for lr_s,mom_s,n in zip(self.lr_scheds, self.mom_scheds, state['n']): lr_s.n,mom_s.n = n,n
+        if self.idx_s < len(self.lr_scheds):
+            self.opt.lr,self.opt.mom = self.lr_scheds[self.idx_s].val,self.mom_scheds[self.idx_s].val
@@ -0,0 +1,110 @@
+"Time the different phases of training to find where the time goes"
+from ..torch_core import *
+from ..callback import *
+from ..basic_train import Learner, LearnerCallback
+
+__all__ = ['Profiler', 'profile']
+
+_phases = ['data', 'forward', 'loss', 'backward', 'step', 'callbacks']
+
+class _TimedLoader():
+    "Wrap `dl` so that the time spent waiting for each batch is reported to `profiler`."
+    def __init__(self, dl:DataLoader, profiler:'Profiler'): self.dl,self.profiler = dl,profiler
+    def __len__(self)->int: return len(self.dl)
+    def __getattr__(self,k:str)->Any: return getattr(self.dl, k)
+
+    def __iter__(self):
+        it = iter(self.dl)
+        while True:
+            start = self.profiler.now()
+            try: b = next(it)
+            except StopIteration: return
+            self.profiler.add_event('data', start, self.profiler.now())
+            yield b
+
+@dataclass
+class Profiler(LearnerCallback):
+    "Time data-wait, forward, loss, backward, optimizer step and callbacks for each training batch of `learn`."
+    _order=-20 # Needs to run before all the other callbacks, including the `Recorder`.
+    cuda_sync:bool=True
+    trace:bool=True
+
+    def __post_init__(self):
+        super().__post_init__()
+        self.cuda_sync = self.cuda_sync and torch.cuda.is_available()
+        self.stats,self.events = [],[]
+
+    def now(self)->float:
+        "Current time in seconds since the beginning of training, after waiting for the GPU if `cuda_sync`."
+        if self.cuda_sync: torch.cuda.synchronize()
+        return time.perf_counter() - self.start
+
+    def add_event(self, phase:str, start:float, end:float)->None:
+        "Account the time between `start` and `end` to `phase`."
+        self.epoch_times[phase] += end-start
+        if self.trace: self.events.append({'name':phase, 'ph':'X', 'ts':start*1e6, 'dur':(end-start)*1e6, 'pid':0, 'tid':0,
+                                           'args':{'epoch':self.epoch, 'iteration':self.iteration}})
+
+    def mark(self, phase:str, train:bool=True)->None:
+        "Close the current interval and account it to `phase`."
+        if not train: return
+        t = self.now()
+        self.add_event(phase, self.last, t)
+        self.last = t
+
+    def on_train_begin(self, **kwargs:Any)->None:
+        "Start the clock and wrap the training dataloader."
+        self.start = time.perf_counter()
+        self.stats,self.events,self.epoch,self.iteration = [],[],0,0
+        self.epoch_times = {p:0. for p in _phases}
+        self.train_dl = self.learn.data.train_dl
+        self.learn.data.train_dl = _TimedLoader(self.train_dl, self)
+
+    def on_epoch_begin(self, epoch:int, **kwargs:Any)->None:
+        "Reset the timings of the epoch."
+        self.epoch,self.epoch_times = epoch,{p:0. for p in _phases}
+
+    def on_batch_begin(self, iteration:int, train:bool, **kwargs:Any)->None:
+        "Start timing a new batch."
+        if train: self.iteration,self.last = iteration,self.now()
+
+    def on_loss_begin(self, train:bool, **kwargs:Any)->None:        self.mark('forward', train)
+    def on_backward_begin(self, train:bool, **kwargs:Any)->None:    self.mark('loss', train)
+    def on_backward_end(self, train:bool, **kwargs:Any)->None:      self.mark('backward', train)
+    def on_step_end(self, train:bool, **kwargs:Any)->None:          self.mark('step', train)
+    def on_batch_end(self, train:bool, step_batch:bool=True, **kwargs:Any)->None:
+        "Close the batch, the last interval is the backward pass if the optimizer didn't step (gradient accumulation)."
+        self.mark('step' if step_batch else 'backward', train)
+
+    def on_epoch_end(self, **kwargs:Any)->None:
+        "Save the timings of the epoch."
+        # Kept out of the `Recorder` table: its extra columns are a single slot, also used by `LossMetrics` or the GAN callbacks.
+        self.stats.append(self.epoch_times)
+
+    def on_train_end(self, **kwargs:Any)->None:
+        "Put back the original training dataloader."
+        self.learn.data.train_dl = self.train_dl
+
+    def summary(self)->pd.DataFrame:
+        "Time spent in each phase for every epoch."
+        return pd.DataFrame(self.stats, columns=_phases)
+
+    def export(self, fname:str='trace.json')->Path:
+        "Save the recorded events as a Chrome trace (to open in `chrome://tracing`) in `fname` inside `learn.path`."
+        path = self.learn.path/fname
+        with open(path, 'w') as f: json.dump({'traceEvents':self.events, 'displayTimeUnit':'ms'}, f)
+        return path
+
+class _ProfilerEnd(Callback):
+    "Run after all the other callbacks so the `Profiler` can time them."
+    _order=100
+    def __init__(self, learn:Learner): self.learn = learn
+    def _mark(self, train:bool=True, **kwargs:Any)->None: self.learn.profiler.mark('callbacks', train)
+    on_batch_begin = on_loss_begin = on_backward_begin = on_backward_end = on_step_end = on_batch_end = _mark
+
+def profile(learn:Learner, cuda_sync:bool=True, trace:bool=True)->Learner:
+    "Time every phase of the training batches of `learn`, results are in `learn.profiler` after `fit`."
+    learn.callback_fns += [partial(Profiler, cuda_sync=cuda_sync, trace=trace), _ProfilerEnd]
+    return learn
+
+Learner.profile = profile
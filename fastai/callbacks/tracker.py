@@ -46,7 +46,7 @@ class TrackerCallback(LearnerCallback):
         "Pick the monitored value."
         if self.monitor=='trn_loss' and len(self.learn.recorder.losses) == 0: return None
         elif len(self.learn.recorder.val_losses) == 0: return None
-        values = {'trn_loss':self.learn.recorder.losses[-1:][0].cpu().numpy(),
+        values = {'trn_loss':self.learn.recorder.losses[-1],
                   'val_loss':self.learn.recorder.val_losses[-1:][0]}
         for i, name in enumerate(self.learn.recorder.names[3:]):
             values[name]=self.learn.recorder.metrics[-1:][0][i]
@@ -54,6 +54,10 @@ class TrackerCallback(LearnerCallback):
             warn(f'{self.__class__} conditioned on metric `{self.monitor}` which is not available. Available metrics are: {", ".join(map(str, self.learn.recorder.names[1:]))}')
         return values.get(self.monitor)
 
+    def get_state(self)->dict:
+        "Return the best value so far."
+        return {'best':self.best}
+
 @dataclass
 class EarlyStoppingCallback(TrackerCallback):
     "A `TrackerCallback` that terminates training when monitored quantity stops improving."
@@ -81,6 +85,10 @@ class EarlyStoppingCallback(TrackerCallback):
                 print(f'Epoch {epoch}: early stopping')
                 return True
 
+    def get_state(self)->dict:
+        "Return the best value so far and the number of epochs without improvement."
+        return {**super().get_state(), 'wait':self.wait}
+
 @dataclass
 class SaveModelCallback(TrackerCallback):
     "A `TrackerCallback` that saves the model when monitored quantity is best."
@@ -133,3 +141,7 @@ class ReduceLROnPlateauCallback(TrackerCallback):
                 self.opt.lr *= self.factor
                 self.wait = 0
                 print(f'Epoch {epoch}: reducing lr to {self.opt.lr}')
+
+    def get_state(self)->dict:
+        "Return the best value so far and the number of epochs without improvement."
+        return {**super().get_state(), 'wait':self.wait}
@@ -15,6 +15,11 @@ class CollabList(TabularList):
 
     def reconstruct(self, t:Tensor): return CollabLine(t, [], self.classes, self.col_names)
 
+    def get_batch(self, idxs:np.ndarray)->List[Tensor]:
+        "The collated data of the items `idxs`: the users and the items."
+        codes = torch.as_tensor(self.codes[idxs])
+        return [codes[:,0],codes[:,1]]
+
 class EmbeddingNN(TabularModel):
     "Subclass `TabularModel` to create a NN suitable for collaborative filtering."
     def __init__(self, emb_szs:ListSizes, **kwargs):
@@ -245,6 +245,90 @@ def array(a, dtype:type=None, **kwargs)->np.ndarray:
         dtype=np.int64
     return np.array(a, dtype=dtype, **kwargs)
 
+def _shared_root(a:np.ndarray)->Optional['SharedArray']:
+    "The `SharedArray` mapping the file `a` is a view of, `None` if it's not backed by one."
+    root = a
+    while isinstance(root, np.ndarray) and not (isinstance(root, SharedArray) and isinstance(root.base, mmap.mmap)):
+        root = root.base
+    return root if isinstance(root, SharedArray) else None
+
+class SharedArray(np.memmap):
+    "A `np.memmap` of a `.npy` file, pickled as a reference to the file so that processes map the same pages."
+    def __reduce__(self):
+        root = _shared_root(self)
+        # Copies that aren't backed by the file anymore (`astype`, fancy indexing...) are pickled with their data.
+        if root is None: return np.asarray(self).__reduce__()
+        return (_shared_view, (root.filename, self.ctypes.data-root.ctypes.data, self.shape, self.strides))
+
+class SharedRaggedArray(np.ndarray):
+    "An object array of items of different lengths stored in one `SharedArray`, pickled as its file and the offsets of the items."
+    def __reduce__(self):
+        roots = [_shared_root(o) if isinstance(o, np.ndarray) else None for o in self]
+        root = roots[0] if len(roots) > 0 and self.ndim == 1 else None
+        # Items replaced by arrays that aren't views of the same file are pickled with their data.
+        if root is None or any(r is not root for r in roots): return np.asarray(self).__reduce__()
+        offsets = np.array([o.ctypes.data-root.ctypes.data for o in self], dtype=np.int64)
+        return (_ragged_view, (root.filename, offsets, np.array([len(o) for o in self], dtype=np.int64)))
+
+_shared_arrays = weakref.WeakValueDictionary()
+
+def load_shared(fname:PathOrStr)->SharedArray:
+    "Map the `.npy` file `fname` copy-on-write, reusing the mapping already open in this process."
+    fname = str(fname)
+    res = _shared_arrays.get(fname)
+    if res is None:
+        with open(fname, 'rb') as f:
+            version = np.lib.format.read_magic(f)
+            read_header = np.lib.format.read_array_header_1_0 if version == (1,0) else np.lib.format.read_array_header_2_0
+            shape,fortran_order,dtype = read_header(f)
+            offset = f.tell()
+        res = SharedArray(fname, dtype=dtype, mode='c', offset=offset, shape=shape, order='F' if fortran_order else 'C')
+        _shared_arrays[fname] = res
+    return res
+
+def _shared_view(fname:str, offset:int, shape:Tuple[int,...], strides:Tuple[int,...])->np.ndarray:
+    root = load_shared(fname)
+    return np.ndarray(shape, dtype=root.dtype, buffer=root, offset=offset, strides=strides)
+
+def _ragged_view(fname:str, offsets:np.ndarray, lens:np.ndarray)->SharedRaggedArray:
+    root = load_shared(fname)
+    res = np.empty(len(offsets), dtype=object)
+    for i,(o,n) in enumerate(zip(offsets, lens)):
+        res[i] = np.ndarray((n,)+root.shape[1:], dtype=root.dtype, buffer=root, offset=o, strides=root.strides)
+    return res.view(SharedRaggedArray)
+
+def _is_ragged(a:np.ndarray)->bool:
+    "If `a` is an object array of arrays with the same non-object dtype and the same shape but for their first dimension."
+    if a.dtype != object or a.ndim != 1 or len(a) == 0 or not isinstance(a[0], np.ndarray) or a[0].ndim == 0: return False
+    dtype,shape = a[0].dtype,a[0].shape[1:]
+    return not dtype.hasobject and all(isinstance(o, np.ndarray) and o.dtype == dtype and o.shape[1:] == shape for o in a)
+
+def share_array(a:Any, fname:PathOrStr)->Any:
+    "Save the array `a` in the `.npy` file `fname` and return its `SharedArray` (`a` unchanged if it can't be mapped)."
+    if not isinstance(a, np.ndarray) or isinstance(a, (SharedArray,SharedRaggedArray)) or a.size == 0: return a
+    if _is_ragged(a):
+        # One array for all the items concatenated, `a` then only holds views on it.
+        flat = share_array(np.concatenate(a), fname)
+        ends = np.cumsum([len(o) for o in a])
+        res = np.empty(len(a), dtype=object)
+        for i,(start,end) in enumerate(zip(np.concatenate([[0], ends[:-1]]), ends)): res[i] = flat[start:end]
+        return res.view(SharedRaggedArray)
+    if a.dtype.hasobject:
+        warn(f"The items saved in {fname} can't be mapped, they will be copied in each worker: only arrays and object arrays of arrays with the same dtype can.")
+        return a
+    # A new file rather than an overwrite, in case other processes still map the previous one.
+    fname = str(fname)
+    if os.path.exists(fname): os.remove(fname)
+    _shared_arrays.pop(fname, None)
+    np.save(fname, np.ascontiguousarray(a))
+    return load_shared(fname)
+
+def shared_dir()->Path:
+    "A new temporary directory in shared memory (`/dev/shm`) when available, removed when python exits."
+    path = tempfile.mkdtemp(prefix='fastai_', dir='/dev/shm' if os.path.isdir('/dev/shm') else None)
+    atexit.register(shutil.rmtree, path, ignore_errors=True)
+    return Path(path)
+
 class EmptyLabel(ItemBase):
     "Should be used for a dummy label."
     def __init__(self): self.obj,self.data = 0.,0.
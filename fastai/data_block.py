@@ -94,6 +94,11 @@ class ItemList():
         if isinstance(idxs, numbers.Integral): return self.get(idxs)
         else: return self.new(self.items[idxs], xtra=index_row(self.xtra, idxs))
 
+    def share(self, path:PathOrStr, name:str='items')->'ItemList':
+        "Move `self.items` to a `SharedArray` saved in `path`/`name`.npy, for the workers to map instead of copying them."
+        self.items = share_array(self.items, Path(path)/f'{name}.npy')
+        return self
+
     @classmethod
     def from_folder(cls, path:PathOrStr, extensions:Collection[str]=None, recurse=True,
                     include:Optional[Collection[str]]=None, **kwargs)->'ItemList':
@@ -258,6 +263,7 @@ class ItemList():
 class EmptyLabelList(ItemList):
     "Basic `ItemList` for dummy labels."
     def get(self, i): return EmptyLabel()
+    def get_batch(self, idxs:np.ndarray)->Tensor: return torch.zeros(len(idxs), dtype=torch.float64)
     def reconstruct(self, t:Tensor, x:Tensor=None):
         if len(t.size()) == 0: return EmptyLabel()
         return self.x.reconstruct(t,x) if has_arg(self.x.reconstruct, 'x') else self.x.reconstruct(t)
@@ -312,6 +318,10 @@ class CategoryList(CategoryListBase):
         if o is None: return None
         return Category(o, self.classes[o])
 
+    def get_batch(self, idxs:np.ndarray)->Tensor:
+        "The collated data of the items `idxs`."
+        return torch.as_tensor(self.items[idxs].astype(np.int64))
+
     def analyze_pred(self, pred, thresh:float=0.5): return pred.argmax()
 
     def reconstruct(self, t):
@@ -368,6 +378,11 @@ class FloatList(ItemList):
         o = super().get(i)
         return FloatItem(log(o) if self.log else o)
 
+    def get_batch(self, idxs:np.ndarray)->Tensor:
+        "The collated data of the items `idxs`."
+        o = self.items[idxs]
+        return torch.as_tensor(log(o) if self.log else o)
+
     def reconstruct(self,t): return FloatItem(t.item())
 
 class ItemLists():
@@ -483,6 +498,22 @@ class LabelList(Dataset):
 
     def __len__(self)->int: return len(self.x) if self.item is None else 1
 
+    @property
+    def batchable(self)->bool:
+        "If the items can be loaded a batch at a time with `get_batch`: `x` and `y` implement it and there are no `tfms`."
+        return (self.item is None and not self.tfms and not (self.tfm_y and getattr(self, 'tfms_y', None))
+                and hasattr(self.x, 'get_batch') and hasattr(self.y, 'get_batch'))
+
+    def get_batch(self, idxs:np.ndarray)->Tuple[Any,Any]:
+        "The collated inputs and targets of the items `idxs`, what `data_collate` returns for `[self[i] for i in idxs]`."
+        return self.x.get_batch(idxs),self.y.get_batch(idxs)
+
+    def share(self, path:PathOrStr, name:str='ds')->'LabelList':
+        "Move the arrays of `x` and `y` to `SharedArray`s saved in `path`."
+        self.x.share(path, f'{name}_x')
+        self.y.share(path, f'{name}_y')
+        return self
+
     @contextmanager
     def set_item(self,item):
         "For inference, will briefly replace the dataset with one that only contains `item`."
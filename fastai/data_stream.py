@@ -0,0 +1,232 @@
+"Streaming `ItemList`s read from a directory of shard files, to train on datasets that don't fit in memory"
+from .torch_core import *
+from .basic_data import *
+from .data_block import *
+
+__all__ = ['StreamingDataLoader', 'StreamingItemList', 'StreamingItemLists', 'StreamingLabelList', 'StreamingLabelLists',
+           'read_shard', 'shard_extensions', 'shard_len']
+
+def _read_jsonl(fname:Path)->Iterator[Any]:
+    "One record per non-empty line of `fname`."
+    with open(fname) as f:
+        for line in f:
+            if line.strip(): yield json.loads(line)
+
+def _len_jsonl(fname:Path)->int:
+    with open(fname, 'rb') as f: return sum(1 for line in f if line.strip())
+
+def _read_npz(fname:Path)->Iterator[Dict[str,np.ndarray]]:
+    "The records `{key:array[i]}` of the arrays of `fname`, that have the same length."
+    with np.load(fname) as d: arrays = {k:d[k] for k in d.files}
+    for i in range(len(next(iter(arrays.values())))): yield {k:a[i] for k,a in arrays.items()}
+
+def _len_npz(fname:Path)->int:
+    # Only reads the header of the first array.
+    with np.load(fname) as d, d.zip.open(d.files[0] + '.npy') as f:
+        version = np.lib.format.read_magic(f)
+        read_header = np.lib.format.read_array_header_1_0 if version == (1,0) else np.lib.format.read_array_header_2_0
+        return read_header(f)[0][0]
+
+def _tar_key(name:str)->Tuple[str,str]:
+    "The name without extensions and the extensions of a file in a tar shard: 'dir/a.seg.png' -> ('dir/a', 'seg.png')."
+    folder,fname = os.path.split(name)
+    key,_,ext = fname.partition('.')
+    return os.path.join(folder, key),ext
+
+def _read_tar(fname:Path)->Iterator[Dict[str,Any]]:
+    "The records `{'__key__':key, ext:bytes}` of the consecutive files with the same name without extensions in `fname`."
+    with tarfile.open(fname) as tar:
+        rec = {}
+        for m in tar:
+            if not m.isfile(): continue
+            key,ext = _tar_key(m.name)
+            if rec.get('__key__') != key:
+                if rec: yield rec
+                rec = {'__key__':key}
+            rec[ext] = tar.extractfile(m).read()
+        if rec: yield rec
+
+def _len_tar(fname:Path)->int:
+    with tarfile.open(fname) as tar: return len({_tar_key(m.name)[0] for m in tar.getmembers() if m.isfile()})
+
+_shard_fns = {'.jsonl':(_read_jsonl,_len_jsonl), '.npz':(_read_npz,_len_npz), '.tar':(_read_tar,_len_tar)}
+shard_extensions = list(_shard_fns.keys())
+
+def read_shard(fname:PathOrStr)->Iterator[Any]:
+    "The records of the shard `fname`: parsed lines of a .jsonl, rows of the arrays of a .npz, files grouped by name of a .tar."
+    fname = Path(fname)
+    return _shard_fns[fname.suffix][0](fname)
+
+def shard_len(fname:PathOrStr)->int:
+    "Number of records in the shard `fname`, without loading them."
+    fname = Path(fname)
+    return _shard_fns[fname.suffix][1](fname)
+
+def _item_list(make:Callable, xs:Collection[Any], **kwargs)->ItemList:
+    "`make(xs, **kwargs)`, with arrays of the same shape stacked and dicts (rows of a table) put in a `DataFrame` in `xtra`."
+    if len(xs) and all(isinstance(o, dict) for o in xs):
+        return make(range(len(xs)), xtra=pd.DataFrame(list(xs)), **kwargs)
+    if len(xs) and all(isinstance(o, np.ndarray) for o in xs) and len({o.shape for o in xs}) == 1: xs = np.stack(xs)
+    return make(xs, **kwargs)
+
+def _shuffle_buffer(items:Iterator[Any], size:int)->Iterator[Any]:
+    "Yield `items` in a random order, drawn from a buffer of `size` items."
+    buf = []
+    for o in items:
+        if len(buf) < size: buf.append(o)
+        else:
+            i = random.randrange(size)
+            yield buf[i]
+            buf[i] = o
+    random.shuffle(buf)
+    yield from buf
+
+class StreamingItemList():
+    "The records of the `shards` files, read lazily, `get_x` extracts from a record the item of an `item_cls`."
+    def __init__(self, shards:Collection[PathOrStr], item_cls:Callable=ItemList, get_x:Callable=noop, path:PathOrStr='.',
+                 **kwargs):
+        self.shards,self.item_cls,self.get_x,self.path,self.kwargs = [Path(s) for s in shards],item_cls,get_x,Path(path),kwargs
+        assert self.shards, 'There are no shards.'
+
+    def __repr__(self)->str: return f'{self.__class__.__name__} ({len(self.shards)} shards of {self.item_cls.__name__})\nPath: {self.path}'
+    def __len__(self)->int: return len(self.shards)
+
+    @classmethod
+    def from_folder(cls, path:PathOrStr, extensions:Collection[str]=shard_extensions, recurse:bool=False,
+                    **kwargs)->'StreamingItemList':
+        "Create a `StreamingItemList` from the shards in `path` that have a suffix in `extensions`."
+        return cls(sorted(get_files(path, extensions, recurse=recurse)), path=path, **kwargs)
+
+    def new(self, shards:Collection[PathOrStr])->'StreamingItemList':
+        "Create a new `StreamingItemList` from `shards`, keeping the same attributes."
+        return self.__class__(shards, item_cls=self.item_cls, get_x=self.get_x, path=self.path, **self.kwargs)
+
+    def records(self, shuffle:bool=False)->Iterator[Any]:
+        "Iterate over the records of all the shards, in a random order of the shards if `shuffle`."
+        shards = list(self.shards)
+        if shuffle: random.shuffle(shards)
+        for s in shards: yield from read_shard(s)
+
+    def split_by_shards(self, valid_shards:Collection[PathOrStr])->'StreamingItemLists':
+        "Split the data by putting the shards named in `valid_shards` in the validation set."
+        valid = {Path(o).name for o in valid_shards}
+        return self.split_by_valid_func(lambda s: s.name in valid)
+
+    def split_by_valid_func(self, func:Callable)->'StreamingItemLists':
+        "Split the data by putting the shards where `func(shard)` is `True` in the validation set."
+        is_valid = [func(s) for s in self.shards]
+        return StreamingItemLists(self.path, self.new([s for s,v in zip(self.shards, is_valid) if not v]),
+                                  self.new([s for s,v in zip(self.shards, is_valid) if v]))
+
+    def random_split_by_pct(self, valid_pct:float=0.2, seed:int=None)->'StreamingItemLists':
+        "Split the shards randomly by putting `valid_pct` of them (at least one) in the validation set, optional `seed` can be passed."
+        if seed is not None: np.random.seed(seed)
+        valid = np.random.permutation(len(self.shards))[:max(1, int(valid_pct * len(self.shards)))]
+        return self.split_by_shards([self.shards[i] for i in valid])
+
+class StreamingItemLists():
+    "A `StreamingItemList` for each of `train` and `valid`."
+    def __init__(self, path:PathOrStr, train:StreamingItemList, valid:StreamingItemList):
+        self.path,self.train,self.valid = Path(path),train,valid
+
+    def __repr__(self)->str: return f'{self.__class__.__name__};\n\nTrain: {self.train};\n\nValid: {self.valid}'
+
+    def label_from_func(self, func:Callable, label_cls:Callable=None, n_sample:int=1000, **kwargs)->'StreamingLabelLists':
+        "Label the records with `func`, fitting the processors on a sample of `n_sample` train records from random shards."
+        samples = [list(itertools.islice(o.records(shuffle=True), n_sample)) for o in (self.train, self.valid)]
+        xs = [_item_list(partial(o.item_cls, path=self.path, **o.kwargs), [o.get_x(r) for r in recs])
+              for o,recs in zip((self.train, self.valid), samples)]
+        lls = ItemLists(self.path, *xs).label_from_lists([func(r) for r in samples[0]], [func(r) for r in samples[1]],
+                                                         label_cls=label_cls, **kwargs)
+        return StreamingLabelLists(self.path, StreamingLabelList(self.train, lls.train, func),
+                                   StreamingLabelList(self.valid, lls.valid, func))
+
+class StreamingLabelList(IterableDataset):
+    "The `(x,y)` items of `items` with labels from `get_y`, processed a shard at a time like the `LabelList` `template`."
+    def __init__(self, items:StreamingItemList, template:LabelList, get_y:Callable, shuffle:bool=False, buffer_size:int=1000):
+        assert get_worker_info is not None, "Streaming datasets need PyTorch 1.2 or later."
+        self.items,self.template,self.get_y,self.shuffle,self.buffer_size = items,template,get_y,shuffle,buffer_size
+        self.seed,self.epoch,self._shard_lens = random.randint(0, 2**31),0,None
+
+    def __repr__(self)->str: return f'{self.__class__.__name__} ({len(self.items)} shards)\n{self.template}'
+
+    def shard_lens(self)->List[int]:
+        "Number of records in each shard, read once."
+        if self._shard_lens is None: self._shard_lens = [shard_len(s) for s in self.items.shards]
+        return self._shard_lens
+
+    def worker_lens(self, n_workers:int)->List[int]:
+        "Number of records read by each of `n_workers` worker processes."
+        return [sum(self.shard_lens()[i::n_workers]) for i in range(n_workers)]
+
+    def __len__(self)->int: return sum(self.shard_lens())
+
+    def __getattr__(self, k:str)->Any:
+        # `x`, `y`, `c`, `classes`, `loss_func`... of the template. Guarded for the attribute lookups of unpickling.
+        if k == 'template': raise AttributeError(k)
+        return getattr(self.template, k)
+
+    def new(self, template:LabelList, shuffle:bool=False)->'StreamingLabelList':
+        "A `StreamingLabelList` of the same shards with `template`."
+        return self.__class__(self.items, template, self.get_y, shuffle=shuffle, buffer_size=self.buffer_size)
+
+    def transform(self, tfms:TfmList, **kwargs)->'StreamingLabelList':
+        "Set the `tfms` applied to the inputs (and targets if `tfm_y`)."
+        self.template.transform(tfms, **kwargs)
+        return self
+
+    def worker_shards(self)->List[Path]:
+        "The shards read by this worker process, the same every epoch (so `worker_lens` holds), in a new random order if `shuffle`."
+        shards = list(self.items.shards)
+        info = get_worker_info()
+        if info is not None: shards = shards[info.id::info.num_workers]
+        if self.shuffle: np.random.RandomState((self.seed + self.epoch) % 2**32).shuffle(shards)
+        return shards
+
+    def process_shard(self, fname:PathOrStr)->LabelList:
+        "The `LabelList` of the records of the shard `fname`, processed with the processors of `self.template`."
+        recs = list(read_shard(fname))
+        x = _item_list(self.template.x.new, [self.items.get_x(r) for r in recs])
+        y = self.template.y.new([self.get_y(r) for r in recs])
+        return self.template.new(x, y).process(filter_missing_y=True)
+
+    def __iter__(self)->Iterator[Tuple[Any,Any]]:
+        items = (ll[i] for s in self.worker_shards() for ll in [self.process_shard(s)] for i in range(len(ll.x.items)))
+        return _shuffle_buffer(items, self.buffer_size) if self.shuffle else items
+
+class StreamingDataLoader(DataLoader):
+    "A `DataLoader` of a `StreamingLabelList` that starts a new epoch (and order of the shards) at each iteration."
+    def __len__(self)->int:
+        "Number of batches: each worker process makes its own batches, the last one partial, with the records of its shards."
+        bs = self.batch_size
+        return sum(n // bs if self.drop_last else math.ceil(n / bs) for n in self.dataset.worker_lens(max(1, self.num_workers)))
+
+    def __iter__(self):
+        # The workers get their copy of the dataset when the iteration starts.
+        self.dataset.epoch += 1
+        return super().__iter__()
+
+class StreamingLabelLists():
+    "A `StreamingLabelList` for each of `train` and `valid`."
+    def __init__(self, path:PathOrStr, train:StreamingLabelList, valid:StreamingLabelList):
+        self.path,self.train,self.valid = Path(path),train,valid
+
+    def __repr__(self)->str: return f'{self.__class__.__name__};\n\nTrain: {self.train};\n\nValid: {self.valid}'
+
+    def transform(self, tfms:Optional[Tuple[TfmList,TfmList]]=(None,None), **kwargs)->'StreamingLabelLists':
+        "Set `tfms` to be applied to the xs of the train and validation set."
+        if not tfms: return self
+        self.train.transform(tfms[0], **kwargs)
+        self.valid.transform(tfms[1], **kwargs)
+        return self
+
+    def databunch(self, path:PathOrStr=None, bs:int=64, num_workers:int=defaults.cpus, buffer_size:int=1000,
+                  **kwargs)->DataBunch:
+        "Create a `DataBunch` of `StreamingDataLoader`s, the training set shuffled by shard and in a buffer of `buffer_size` items."
+        path = Path(ifnone(path, self.path))
+        self.train.shuffle,self.train.buffer_size = True,buffer_size
+        # The training set, without training tfms.
+        fix = self.train.new(self.valid.template.new(self.train.template.x, self.train.template.y))
+        dls = [StreamingDataLoader(ds, batch_size=bs, drop_last=ds.shuffle and bs>1, num_workers=num_workers)
+               for ds in (self.train, self.valid, fix)]
+        return self.train.template.x._bunch(*dls, path=path, **kwargs)
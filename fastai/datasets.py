@@ -74,6 +74,22 @@ class Config():
         assert fpath.exists(), f'Could not find config at: {fpath}. Please create'
         with open(fpath, 'r') as yaml_file: return yaml.load(yaml_file)
 
+    @classmethod
+    def save(cls, config:dict, fpath=None):
+        "Save the `Config` dictionary `config` in `fpath`."
+        fpath = _expand_path(fpath or cls.DEFAULT_CONFIG_PATH)
+        fpath.parent.mkdir(parents=True, exist_ok=True)
+        with open(fpath, 'w') as yaml_file:
+            yaml.dump(config, yaml_file, default_flow_style=False)
+
+    @classmethod
+    def tuned(cls, fpath=None):
+        "Get the number of threads and workers saved by `fastai.tune.autotune` in `fpath`, without creating the config file."
+        fpath = _expand_path(fpath or cls.DEFAULT_CONFIG_PATH)
+        if not fpath.exists(): return {}
+        with open(fpath, 'r') as yaml_file: config = yaml.safe_load(yaml_file) or {}
+        return {k:config[k] for k in ('num_threads', 'num_workers') if k in config}
+
     @classmethod
     def create(cls, fpath):
         "Creates a `Config` from `fpath`."
@@ -1,9 +1,9 @@
-import csv, gc, gzip, os, pickle, shutil, sys, warnings, yaml
+import csv, gc, gzip, os, pickle, shutil, sys, time, traceback, warnings, yaml
 import math, matplotlib.pyplot as plt, numpy as np, pandas as pd, random
 import scipy.stats, scipy.special
-import abc, collections, hashlib, itertools, json, operator, pathlib
+import abc, atexit, collections, hashlib, itertools, json, mmap, operator, pathlib, tempfile, weakref
 import mimetypes, inspect, typing, functools, importlib
-import html, re, spacy, requests, tarfile, numbers
+import html, re, spacy, requests, tarfile, numbers, queue, threading, asyncio
 
 from abc import abstractmethod, abstractproperty
 from collections import abc,  Counter, defaultdict, Iterable, namedtuple, OrderedDict
@@ -1,5 +1,11 @@
 import torch, torch.nn.functional as F
 from torch import ByteTensor, DoubleTensor, FloatTensor, HalfTensor, LongTensor, ShortTensor, Tensor
 from torch import nn, optim, as_tensor
-from torch.utils.data import BatchSampler, DataLoader, Dataset, Sampler, TensorDataset
+from torch.utils.data import BatchSampler, DataLoader, Dataset, RandomSampler, Sampler, SequentialSampler
+from torch.utils.data import TensorDataset
+try: from torch.utils.data import IterableDataset, get_worker_info
+except ImportError:
+    # Only in PyTorch >= 1.2: nothing is an `IterableDataset` before, and `fastai.data_stream` can't be used.
+    class IterableDataset(Dataset): pass
+    get_worker_info = None
 from torch.nn.utils import weight_norm, spectral_norm
@@ -0,0 +1,112 @@
+"Export and quantize trained `Learner`s for fast CPU inference"
+from .torch_core import *
+from .basic_data import *
+from .basic_train import *
+from .data_block import *
+from .benchmarks import time_ms
+from io import BytesIO
+
+__all__ = ['export_torchscript', 'load_learner', 'quantization_report', 'quantize', 'quantize_model', 'trace_model']
+
+class _FirstOutput(nn.Module):
+    "Wrap `model` to only return its first output."
+    def __init__(self, model:nn.Module):
+        super().__init__()
+        self.model = model
+
+    def forward(self, *xb:Tensor)->Tensor:
+        # The text models return their raw and dropped-out outputs too.
+        out = self.model(*xb)
+        return out[0] if is_listy(out) else out
+
+def _script_submodules(model:nn.Module)->nn.Module:
+    "Copy of `model` with the modules that have a `script` method replaced by their scripted version."
+    if hasattr(model, 'script'): return model.script()
+    model = deepcopy(model)
+    for m in list(model.modules()):
+        for n,c in m.named_children():
+            if hasattr(c, 'script'): setattr(m, n, c.script())
+    return model
+
+def trace_model(model:nn.Module, xb:Tensors)->torch.jit.ScriptModule:
+    "Trace `model` in eval mode on the batch of inputs `xb`, keeping only the first output."
+    model.eval()
+    # Puts back the weights without dropout of the RNNs so they can be copied.
+    if hasattr(model, 'reset'): model.reset()
+    # Traced, the loops and hidden states of the RNNs would be fixed to the batch size and sequence length of `xb`.
+    model = _script_submodules(model)
+    with torch.no_grad(): return torch.jit.trace(_FirstOutput(model), tuple(xb) if is_listy(xb) else (xb,))
+
+def _preprocessing_state(data:DataBunch)->dict:
+    "The state needed to prepare the inputs and decode the outputs of the model, with only python types."
+    state = {}
+    if getattr(data, 'classes', None) is not None: state['classes'] = [str(c) for c in data.classes]
+    if getattr(data, 'norm', False):
+        state['normalize'] = {k:(to_np(v).tolist() if isinstance(v, Tensor) else v) for k,v in data.norm.keywords.items()}
+    return state
+
+def export_torchscript(learn:Learner, fname:PathOrStr='export.pt', example_batch:Tensors=None,
+                       ds_type:DatasetType=DatasetType.Valid)->Path:
+    "Save `learn.model` traced on `example_batch` (a batch of `ds_type` by default) in `learn.path/fname`, with its preprocessing."
+    # The preprocessing goes in `{stem}_data.pkl`, so it doesn't overwrite the `export.pkl` of `DataBunch.export`.
+    if example_batch is None: example_batch = learn.data.one_batch(ds_type, detach=False, denorm=False)[0]
+    path = learn.path/fname
+    trace_model(learn.model, example_batch).save(str(path))
+    # The pickled state of `DataBunch.export` for fastai, and its plain version for inference without it.
+    xtra = dict(normalize=learn.data.norm.keywords) if getattr(learn.data, 'norm', False) else {}
+    learn.data.valid_ds.export(path.parent/f'{path.stem}_data.pkl', **xtra)
+    with open(path.with_suffix('.json'), 'w') as f: json.dump(_preprocessing_state(learn.data), f)
+    return path
+
+def load_learner(path:PathOrStr, fname:PathOrStr='export.pt')->Learner:
+    "Load the model and preprocessing saved by `export_torchscript` in `path/fname` in a `Learner` for inference."
+    path = Path(path)
+    model = torch.jit.load(str(path/fname), map_location=defaults.device)
+    data = DataBunch.load_empty(path, fname=f'{Path(fname).stem}_data.pkl')
+    return Learner(data, model, layer_groups=[model])
+
+def quantize_model(model:nn.Module, dtype:torch.dtype=torch.qint8)->nn.Module:
+    "Return a copy of `model` on the cpu with dynamically quantized weights (`dtype`) for its `nn.Linear` and `nn.LSTM` layers."
+    assert hasattr(torch, 'quantization'), "Dynamic quantization needs PyTorch 1.3 or later."
+    model = deepcopy(model).cpu().eval()
+    # Puts back the weights without dropout in the LSTMs wrapped by `WeightDropout` so they get quantized.
+    if hasattr(model, 'reset'): model.reset()
+    return torch.quantization.quantize_dynamic(model, {nn.Linear, nn.LSTM}, dtype=dtype)
+
+def quantize(learn:Learner, dtype:torch.dtype=torch.qint8)->nn.Module:
+    "Return a dynamically quantized copy of `learn.model` for cpu inference."
+    return quantize_model(learn.model, dtype=dtype)
+
+def _model_size(model:nn.Module)->float:
+    "Size in MB of the saved weights of `model`."
+    buf = BytesIO()
+    torch.save(model.state_dict(), buf)
+    return buf.tell() / 2**20
+
+def _latency(model:nn.Module, xb:Tensors, n_iter:int)->float:
+    "Time in ms of a forward pass of `model` on `xb`."
+    xb = xb if is_listy(xb) else [xb]
+    with torch.no_grad(): return time_ms(lambda: model(*xb), n_iter)
+
+def quantization_report(learn:Learner, qmodel:nn.Module=None, ds_type:DatasetType=DatasetType.Valid,
+                        n_iter:int=10)->pd.DataFrame:
+    "Compare loss, metrics on `ds_type`, latency on one batch and size of `learn.model` and its quantized version `qmodel` on the cpu."
+    qmodel = ifnone(qmodel, quantize(learn))
+    dl = learn.dl(ds_type)
+    dl = DeviceDataLoader(dl.dl, torch.device('cpu'), dl.tfms, dl.collate_fn)
+    xb = next(iter(dl))[0]
+    names = ['loss'] + [getattr(m, '__name__', camel2snake(m.__class__.__name__)) for m in learn.metrics]
+    model,res = learn.model,{}
+    try:
+        for name,m in [('fp32', deepcopy(model).cpu().eval()), ('int8', qmodel)]:
+            learn.model = m
+            row = dict(zip(names, [to_np(v).item() if isinstance(v, Tensor) else v for v in learn.validate(dl)]))
+            res[name] = {**row, 'latency_ms':_latency(m, xb, n_iter), 'size_mb':_model_size(m)}
+    finally: learn.model = model
+    df = pd.DataFrame(res).T
+    df.loc['delta'] = df.loc['int8'] - df.loc['fp32']
+    return df
+
+Learner.export_torchscript = export_torchscript
+Learner.quantize = quantize
+Learner.quantization_report = quantization_report
@@ -0,0 +1,135 @@
+"Serve a `Learner` on a local HTTP endpoint, running the model on micro-batches of the concurrent requests"
+from .torch_core import *
+from .basic_train import *
+from .inference import load_learner
+
+__all__ = ['InferenceServer', 'serve']
+
+_statuses = {200:'OK', 400:'Bad Request', 404:'Not Found', 500:'Internal Server Error'}
+
+async def _read_http(reader:asyncio.StreamReader)->Optional[Tuple[str,str,Dict[str,str],bytes]]:
+    "Read one HTTP/1.1 message in `reader`: first two words of the start line, headers and body (`None` at the end of the stream)."
+    line = await reader.readline()
+    if not line: return None
+    start = line.decode().rstrip('\r\n').split(' ')
+    headers = {}
+    while True:
+        h = await reader.readline()
+        if h in (b'\r\n', b'\n', b''): break
+        k,v = h.decode().split(':', 1)
+        headers[k.strip().lower()] = v.strip()
+    body = await reader.readexactly(int(headers.get('content-length', 0)))
+    return start[0],start[1],headers,body
+
+def _http_message(first_line:str, body:bytes)->bytes:
+    "An HTTP/1.1 message starting with `first_line` with a JSON `body`."
+    return f'{first_line}\r\nContent-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n'.encode() + body
+
+class InferenceServer():
+    "Answer prediction requests with `learn.predict_batch` on micro-batches of at most `max_bs` items, waiting at most `max_wait_ms` to fill one."
+    def __init__(self, learn:Union[Learner,PathOrStr], max_bs:int=64, max_wait_ms:float=5., item_fn:Callable=None,
+                 n_latencies:int=10000):
+        # A path is the folder of a learner exported with `export_torchscript`.
+        if not isinstance(learn, Learner): learn = load_learner(learn)
+        self.learn,self.max_bs,self.max_wait,self.item_fn = learn,max_bs,max_wait_ms/1000,ifnone(item_fn,noop)
+        self.latencies = collections.deque(maxlen=n_latencies)
+        # The model runs in one thread so that the event loop keeps collecting the next micro-batch.
+        self.executor = ThreadPoolExecutor(1)
+        self.reset_stats()
+
+    def reset_stats(self)->None:
+        "Reset the latency and throughput counters."
+        self.latencies.clear()
+        self.n_requests,self.n_batches,self.start_time = 0,0,time.perf_counter()
+
+    def stats(self)->Dict[str,float]:
+        "Latency percentiles (in ms) and throughput since the last `reset_stats`."
+        lat = np.array(self.latencies) * 1e3
+        elapsed = time.perf_counter() - self.start_time
+        return {'requests':self.n_requests, 'batches':self.n_batches, 'mean_bs':self.n_requests / max(self.n_batches,1),
+                'requests_per_s':self.n_requests / elapsed,
+                'p50_ms':float(np.percentile(lat, 50)) if len(lat) else None,
+                'p99_ms':float(np.percentile(lat, 99)) if len(lat) else None}
+
+    async def predict(self, item:Any)->Tuple:
+        "Queue `item` (converted by `item_fn`) for the next micro-batch and wait for its prediction."
+        fut = asyncio.get_event_loop().create_future()
+        await self.queue.put((self.item_fn(item), fut))
+        return await fut
+
+    async def batcher(self)->None:
+        "Group the queued items in micro-batches and run the model on them."
+        loop = asyncio.get_event_loop()
+        while True:
+            batch = [await self.queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_bs:
+                timeout = deadline - loop.time()
+                if timeout <= 0: break
+                try: batch.append(await asyncio.wait_for(self.queue.get(), timeout))
+                except asyncio.TimeoutError: break
+            items,futs = zip(*batch)
+            try:
+                res = await loop.run_in_executor(self.executor, partial(self.learn.predict_batch, list(items), bs=len(items)))
+                for f,r in zip(futs,res):
+                    if not f.done(): f.set_result(r)
+            except Exception as e:
+                for f in futs:
+                    if not f.done(): f.set_exception(e)
+            self.n_batches += 1
+
+    async def answer(self, method:str, path:str, body:bytes)->Tuple[int,dict]:
+        "Status code and JSON answer to a request."
+        if method == 'GET' and path == '/stats': return 200,self.stats()
+        if method != 'POST' or path != '/predict': return 404,{'error':f'No route for {method} {path}.'}
+        try: item = json.loads(body)['item']
+        except (ValueError, KeyError): return 400,{'error':'The body should be a JSON object with an "item" key.'}
+        start = time.perf_counter()
+        try: out,pred,raw = await self.predict(item)
+        except Exception as e: return 500,{'error':repr(e)}
+        self.latencies.append(time.perf_counter() - start)
+        self.n_requests += 1
+        return 200,{'prediction':str(out), 'output':to_np(raw).tolist()}
+
+    async def handle(self, reader:asyncio.StreamReader, writer:asyncio.StreamWriter)->None:
+        "Answer the requests of one (keep-alive) connection."
+        try:
+            while True:
+                req = await _read_http(reader)
+                if req is None: break
+                method,path,headers,body = req
+                status,res = await self.answer(method, path, body)
+                writer.write(_http_message(f'HTTP/1.1 {status} {_statuses[status]}', json.dumps(res).encode()))
+                await writer.drain()
+                if headers.get('connection', '').lower() == 'close': break
+        except (asyncio.IncompleteReadError, ConnectionError): pass
+        finally: writer.close()
+
+    async def start(self, host:str='127.0.0.1', port:int=8000)->asyncio.AbstractServer:
+        "Start the batcher and the HTTP server on `host`:`port` (a free port if 0)."
+        self.queue = asyncio.Queue()
+        self.batcher_task = asyncio.get_event_loop().create_task(self.batcher())
+        self.server = await asyncio.start_server(self.handle, host, port)
+        self.reset_stats()
+        return self.server
+
+    @property
+    def port(self)->int: return self.server.sockets[0].getsockname()[1]
+
+    async def stop(self)->None:
+        "Stop accepting connections and stop the batcher."
+        self.server.close()
+        await self.server.wait_closed()
+        self.batcher_task.cancel()
+
+def serve(learn:Union[Learner,PathOrStr], host:str='127.0.0.1', port:int=8000, **kwargs)->None:
+    "Serve `learn` (or the learner exported in this folder) on `host`:`port` until interrupted: POST `{\"item\": ...}` to /predict, GET /stats."
+    server = InferenceServer(learn, **kwargs)
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(server.start(host, port))
+        warn(f'Serving on http://{host}:{server.port}')
+        try: loop.run_forever()
+        except KeyboardInterrupt: pass
+        finally: loop.run_until_complete(server.stop())
+    finally: loop.close()
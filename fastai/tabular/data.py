@@ -121,6 +121,17 @@ class TabularList(ItemList):
         conts = [] if self.conts is None else self.conts[o]
         return self._item_cls(codes, conts, self.classes, self.col_names)
 
+    def get_batch(self, idxs:np.ndarray)->List[Tensor]:
+        "The collated data of the items `idxs`."
+        return [torch.zeros(len(idxs), 0) if a is None else torch.as_tensor(a[idxs]) for a in (self.codes, self.conts)]
+
+    def share(self, path:PathOrStr, name:str='items')->'TabularList':
+        "Move `self.items`, `self.codes` and `self.conts` to `SharedArray`s saved in `path`."
+        super().share(path, name)
+        for k in ('codes','conts'):
+            if hasattr(self, k): setattr(self, k, share_array(getattr(self, k), Path(path)/f'{name}_{k}.npy'))
+        return self
+
     def get_emb_szs(self, sz_dict=None):
         "Return the default embedding sizes suitable for this data or takes the ones in `sz_dict`."
         return [def_emb_sz(self.classes, n, sz_dict) for n in self.cat_names]
@@ -1,6 +1,7 @@
 'Model training for NLP'
 from ..torch_core import *
 from ..basic_train import *
+from ..basic_train import _progress_bar
 from ..callbacks import *
 from ..basic_data import *
 from ..datasets import untar_data
@@ -91,7 +92,7 @@ class LanguageLearner(RNNLearner):
         "Return the `n_words` that come after `text`."
         ds = self.data.single_dl.dataset
         self.model.reset()
-        for _ in progress_bar(range(n_words), leave=False):
+        for _ in _progress_bar(range(n_words), self.no_bar, leave=False):
             xb, yb = self.data.one_item(text)
             xb = xb.view(-1,1)
             res = self.pred_batch(batch=(xb,yb))[-1]
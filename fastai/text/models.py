@@ -131,6 +131,40 @@ class RNNCore(nn.Module):
         if self.qrnn: self.hidden = [self._one_hidden(l) for l in range(self.n_layers)]
         else: self.hidden = [(self._one_hidden(l), self._one_hidden(l)) for l in range(self.n_layers)]
 
+    def script(self)->torch.jit.ScriptModule:
+        "Scripted copy of `self` in eval mode, starting from a zero hidden state at each call, for any batch size and sequence length."
+        return torch.jit.script(_InferenceRNN(self))
+
+def _raw_lstm(rnn:WeightDropout)->nn.LSTM:
+    "Copy of the LSTM in `rnn` with its weights without dropout."
+    lstm = rnn.module
+    res = nn.LSTM(lstm.input_size, lstm.hidden_size, lstm.num_layers, bidirectional=lstm.bidirectional)
+    res.load_state_dict({k:(getattr(rnn, f'{k}_raw') if k in rnn.layer_names else v) for k,v in lstm.state_dict().items()})
+    return res
+
+class _InferenceRNN(nn.Module):
+    "The forward pass of `core` in eval mode, keeping the outputs of the last `max_seq` tokens (rounded to `bptt`) if `max_seq > 0`."
+    def __init__(self, core:RNNCore, bptt:int=1, max_seq:int=0):
+        super().__init__()
+        assert not core.qrnn, "Only the LSTM version of `RNNCore` can be scripted."
+        self.bptt,self.max_seq = bptt,max_seq
+        self.encoder = deepcopy(core.encoder)
+        self.rnns = nn.ModuleList([_raw_lstm(rnn) for rnn in core.rnns]).to(core.encoder.weight)
+
+    def forward(self, input:Tensor)->Tuple[List[Tensor],List[Tensor]]:
+        # Without dropout, a single pass over the full sequence is the same as the passes on each bptt chunk.
+        output = self.encoder(input)
+        outputs = []
+        for rnn in self.rnns:
+            output,_ = rnn(output)
+            outputs.append(output)
+        sl = input.size(0)
+        if self.max_seq > 0 and sl >= self.max_seq:
+            # `MultiBatchRNNCore` only keeps the chunks starting after `sl-max_seq`.
+            start = ((sl - self.max_seq) // self.bptt + 1) * self.bptt
+            outputs = [o[start:] for o in outputs]
+        return outputs, outputs
+
 class LinearDecoder(nn.Module):
     "To go on top of a RNNCore module and create a Language Model."
     initrange=0.1
@@ -177,6 +211,10 @@ class MultiBatchRNNCore(RNNCore):
                 outputs.append(o)
         return self.concat(raw_outputs), self.concat(outputs)
 
+    def script(self)->torch.jit.ScriptModule:
+        "Scripted copy of `self` in eval mode, for any batch size and sequence length."
+        return torch.jit.script(_InferenceRNN(self, self.bptt, self.max_seq))
+
 class PoolingLinearClassifier(nn.Module):
     "Create a linear classifier with pooling."
 
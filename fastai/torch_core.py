@@ -104,6 +104,12 @@ def data_collate(batch:ItemsList)->Tensor:
     "Convert `batch` items to tensor data."
     return torch.utils.data.dataloader.default_collate(to_data(batch))
 
+def foreach_mul_(ts:Collection[Tensor], v:Number)->None:
+    "Multiply all the tensors in `ts` by `v` in place, with a single grouped kernel when pytorch supports it."
+    if hasattr(torch, '_foreach_mul_'): torch._foreach_mul_(list(ts), v)
+    else:
+        for t in ts: t.mul_(v)
+
 def requires_grad(m:nn.Module, b:Optional[bool]=None)->Optional[bool]:
     "If `b` is not set `requires_grad` on all params in `m`, else return `requires_grad` of first param."
     ps = list(m.parameters())
@@ -116,6 +122,25 @@ def trainable_params(m:nn.Module)->ParamList:
     res = filter(lambda p: p.requires_grad, m.parameters())
     return res
 
+def flatten_params(params:ParamList)->ParamList:
+    "Repack `params` (and their gradients) as views of one contiguous buffer, return `[flat_param]` to optimize."
+    params = list(params)
+    if len(params) == 0: return params
+    p0 = params[0]
+    if any(p.dtype != p0.dtype or p.device != p0.device for p in params): return params
+    flat = p0.data.new_zeros(sum(p.numel() for p in params))
+    flat_grad = torch.zeros_like(flat)
+    i = 0
+    for p in params:
+        n = p.numel()
+        flat[i:i+n].copy_(p.data.reshape(-1))
+        if p.grad is not None: flat_grad[i:i+n].copy_(p.grad.reshape(-1))
+        p.data,p.grad = flat[i:i+n].view_as(p.data),flat_grad[i:i+n].view_as(p.data)
+        i += n
+    flat = nn.Parameter(flat)
+    flat.grad = flat_grad
+    return [flat]
+
 def children(m:nn.Module)->ModuleList:
     "Get children of `m`."
     return list(m.children())
@@ -302,6 +327,19 @@ def one_param(m: nn.Module)->Tensor:
     "Return the first parameter of `m`."
     return next(m.parameters())
 
+def rng_states()->dict:
+    "The states of the random number generators of torch (and cuda), numpy and python."
+    rng = {'torch':torch.get_rng_state(), 'numpy':np.random.get_state(), 'random':random.getstate()}
+    if torch.cuda.is_available(): rng['cuda'] = torch.cuda.get_rng_state_all()
+    return rng
+
+def set_rng_states(rng:dict)->None:
+    "Restore the states of the random number generators returned by `rng_states`."
+    torch.set_rng_state(rng['torch'])
+    np.random.set_state(rng['numpy'])
+    random.setstate(rng['random'])
+    if 'cuda' in rng and torch.cuda.is_available(): torch.cuda.set_rng_state_all(rng['cuda'])
+
 def try_int(o:Any)->Any:
     "Try to convert `o` to int, default to `o` if not possible."
     # NB: single-item rank-1 array/tensor can be converted to int, but we don't want to do this
@@ -27,13 +27,13 @@ def lr_find(learn:Learner, start_lr:Floats=1e-7, end_lr:Floats=10, num_it:int=10
     end_lr = learn.lr_range(end_lr)
     end_lr = np.array(end_lr) if is_listy(end_lr) else end_lr
     cb = LRFinder(learn, start_lr, end_lr, num_it, stop_div)
-    a = int(np.ceil(num_it/len(learn.data.train_dl)))
+    a = int(np.ceil(num_it*learn.n_accum/len(learn.data.train_dl)))
     learn.fit(a, start_lr, callbacks=[cb], **kwargs)
 
-def to_fp16(learn:Learner, loss_scale:float=512., flat_master:bool=False)->Learner:
-    "Put `learn` in FP16 precision mode."
+def to_fp16(learn:Learner, loss_scale:float=None, flat_master:bool=False, dynamic:bool=True, max_noskip:int=1000)->Learner:
+    "Put `learn` in FP16 precision mode, with a `dynamic` loss scale by default."
     learn.model = model2half(learn.model)
-    learn.mp_cb = MixedPrecision(learn, loss_scale=loss_scale, flat_master=flat_master)
+    learn.mp_cb = MixedPrecision(learn, loss_scale=loss_scale, flat_master=flat_master, dynamic=dynamic, max_noskip=max_noskip)
     learn.callbacks.append(learn.mp_cb)
     return learn
 
@@ -54,11 +54,11 @@ class ShowGraph(LearnerCallback):
         "If we have `last_metrics` plot them in our pbar graph"
         if last_metrics is not None:
             rec = self.learn.recorder
-            iters = range_of(rec.losses)
             val_iter = np.array(rec.nb_batches).cumsum()
-            x_bounds = (0, (n_epochs - len(rec.nb_batches)) * rec.nb_batches[-1] + len(rec.losses))
-            y_bounds = (0, max((max(Tensor(rec.losses)), max(Tensor(rec.val_losses)))))
-            rec.pbar.update_graph([(iters, rec.losses), (val_iter, rec.val_losses)], x_bounds, y_bounds)
+            x_bounds = (0, (n_epochs - len(rec.nb_batches)) * rec.nb_batches[-1] + rec.losses.n_iter)
+            # The maximum of the losses is tracked as they are recorded, and there are only `max_len` of them to draw.
+            y_bounds = (0, max(rec.losses.max, max(float(v) for v in rec.val_losses)))
+            rec.pbar.update_graph([(rec.losses.iterations, np.array(rec.losses)), (val_iter, rec.val_losses)], x_bounds, y_bounds)
             return False
 
 class BnFreeze(LearnerCallback):
@@ -74,7 +74,10 @@ class GradientClipping(LearnerCallback):
 
     def on_backward_end(self, **kwargs):
         "Clip the gradient before the optimizer step."
-        if self.clip: nn.utils.clip_grad_norm_(self.learn.model.parameters(), self.clip)
+        if not self.clip: return
+        # With flat parameters, clip the few flat gradients instead of every parameter of the model.
+        params = self.learn.opt.params if self.learn.opt.flat_params else self.learn.model.parameters()
+        nn.utils.clip_grad_norm_(params, self.clip)
 
 def clip_grad(learn:Learner, clip:float=0.1)->Learner:
     "Add gradient clipping of `clip` during training."
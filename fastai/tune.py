@@ -0,0 +1,131 @@
+"Find the fastest number of cpu threads, data loader workers and batch size to train a `Learner`"
+from .torch_core import *
+from .basic_data import *
+from .basic_train import *
+from .datasets import Config
+try: import resource
+except ImportError: resource = None # Not available on Windows.
+
+__all__ = ['apply_tuned', 'autotune', 'bs_find', 'plot_bs_find']
+
+def _powers_of_2(n:int)->List[int]:
+    "Powers of 2 up to `n`, and `n`."
+    res = [2**i for i in range(int(math.log2(n))+1)]
+    return res if res[-1] == n else res + [n]
+
+def _time_train(learn:Learner, dl:DeviceDataLoader, n_batch:int)->float:
+    "Average time of the next `n_batch` training steps on `dl` (at most all its batches), after one warm-up batch if `dl` has more."
+    learn.model.train()
+    n_warmup = 1 if len(dl) > 1 else 0
+    n_batch = max(1, min(n_batch, len(dl)-n_warmup))
+    it = iter(dl)
+    try:
+        for i in range(n_warmup+n_batch):
+            if i == n_warmup: start = time.perf_counter()
+            xb,yb = next(it)
+            loss_batch(learn.model, xb, yb, learn.loss_func, learn.opt)
+        if torch.cuda.is_available(): torch.cuda.synchronize()
+        return (time.perf_counter() - start) / n_batch
+    finally: it.close()
+
+def autotune(learn:Learner, threads:Collection[int]=None, workers:Collection[int]=None, n_batch:int=10,
+             save:bool=True)->pd.DataFrame:
+    "Time `n_batch` training steps of `learn` for all `threads` and `workers` counts, use the fastest (saved in `Config` if `save`)."
+    threads = ifnone(threads, _powers_of_2(num_cpus()))
+    workers = ifnone(workers, [0] + _powers_of_2(num_cpus()))
+    if not getattr(learn, 'opt', False): learn.create_opt(defaults.lr, learn.wd)
+    # The weights, optimizer state and running statistics of the batchnorm layers change during the timed steps.
+    state = {'model':deepcopy(learn.model.state_dict()), 'opt':deepcopy(learn.opt.state_dict())}
+    res = []
+    try:
+        for w in workers:
+            learn.data.train_dl.num_workers = w
+            for t in threads:
+                torch.set_num_threads(t)
+                res.append({'threads':t, 'workers':w, 'batch_ms':_time_train(learn, learn.data.train_dl, n_batch) * 1e3})
+    finally:
+        learn.model.load_state_dict(state['model'])
+        learn.opt.load_state_dict(state['opt'])
+    res = pd.DataFrame(res)
+    best = res.loc[res['batch_ms'].idxmin()]
+    n_threads,n_workers = int(best['threads']),int(best['workers'])
+    torch.set_num_threads(n_threads)
+    for dl in learn.data.dls:
+        if dl is not learn.data.single_dl: dl.num_workers = n_workers
+    defaults.cpus = n_workers
+    if save: Config.save({**Config.get(), 'num_threads':n_threads, 'num_workers':n_workers})
+    return res
+
+def apply_tuned(fpath:PathOrStr=None)->dict:
+    "Use the number of cpu threads and data loader workers saved by `autotune` in the config file `fpath`, return them."
+    tuned = Config.tuned(fpath)
+    if 'num_threads' in tuned: torch.set_num_threads(tuned['num_threads'])
+    if 'num_workers' in tuned: defaults.cpus = tuned['num_workers']
+    return tuned
+
+def _mem_name()->str:
+    "Column of the memory reported by `_peak_mem`: on the cpu it's the peak of the process since it started, it never goes down."
+    return 'peak_mem_mb' if torch.cuda.is_available() else 'process_peak_rss_mb'
+
+def _peak_mem()->float:
+    "Peak memory in MB: allocated by PyTorch on the gpu since the last reset, resident set of the process since it started on the cpu."
+    if torch.cuda.is_available(): return torch.cuda.max_memory_allocated() / 2**20
+    if resource is None: return np.nan
+    # `ru_maxrss` is in bytes on macOS and in kilobytes elsewhere.
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2**20 if sys.platform == 'darwin' else 2**10)
+
+def _is_oom(e:Exception)->bool:
+    "If `e` was raised because an allocation failed on the gpu or cpu."
+    return isinstance(e, MemoryError) or (isinstance(e, RuntimeError) and
+        any(m in str(e) for m in ('out of memory', "can't allocate memory")))
+
+def bs_find(learn:Learner, start_bs:int=8, end_bs:int=None, n_batch:int=5, max_mem:float=None)->pd.DataFrame:
+    "Train `learn` for `n_batch` steps at batch sizes doubling from `start_bs` to `end_bs`, until out of data, memory or above `max_mem` MB."
+    end_bs = ifnone(end_bs, len(learn.data.train_ds) // (n_batch+1))
+    if not getattr(learn, 'opt', False): learn.create_opt(defaults.lr, learn.wd)
+    # Snapshot in memory rather than on disk as `lr_find` does, the bursts are short.
+    state = {'model':deepcopy(learn.model.state_dict()), 'opt':deepcopy(learn.opt.state_dict())}
+    res,bs,mem_name = [],start_bs,_mem_name()
+    try:
+        while bs <= end_bs:
+            dl = learn.data.train_dl.new(batch_size=bs, shuffle=True, drop_last=True)
+            if len(dl) < n_batch+1:
+                warn(f'Not enough training data for {n_batch+1} batches of size {bs}, stopping there.')
+                break
+            if torch.cuda.is_available(): torch.cuda.reset_max_memory_allocated()
+            try: batch_time = _time_train(learn, dl, n_batch)
+            except Exception as e:
+                if not _is_oom(e): raise
+                break
+            finally:
+                learn.opt.zero_grad()
+                if torch.cuda.is_available(): torch.cuda.empty_cache()
+            mem = _peak_mem()
+            if max_mem is not None and mem > max_mem: break
+            res.append({'bs':bs, 'items_per_s':bs / batch_time, mem_name:mem})
+            bs *= 2
+    finally:
+        learn.model.load_state_dict(state['model'])
+        learn.opt.load_state_dict(state['opt'])
+    res = pd.DataFrame(res, columns=['bs', 'items_per_s', mem_name])
+    if len(res) == 0: warn(f'No batch size from {start_bs} fits in memory.')
+    else: print(f"BS Finder is complete, the fastest batch size is {res.loc[res['items_per_s'].idxmax(), 'bs']}. "
+                "Use `plot_bs_find` to see the graph.")
+    return res
+
+def plot_bs_find(res:pd.DataFrame)->None:
+    "Plot the throughput and peak memory (last column) of the batch sizes tried by `bs_find`, marking the fastest."
+    _, ax = plt.subplots(1,1)
+    ax.plot(res['bs'], res['items_per_s'])
+    best = res.loc[res['items_per_s'].idxmax()]
+    ax.plot(best['bs'], best['items_per_s'], markersize=10, marker='o', color='red')
+    ax.set_ylabel("Items/s")
+    ax.set_xlabel("Batch size")
+    ax.set_xscale('log')
+    ax.xaxis.set_major_formatter(plt.ScalarFormatter())
+    ax2 = ax.twinx()
+    ax2.plot(res['bs'], res.iloc[:,-1], linestyle='--', color='gray')
+    ax2.set_ylabel("Peak memory (MB)" if res.columns[-1] == 'peak_mem_mb' else "Process peak memory (MB)")
+
+Learner.autotune = autotune
+Learner.bs_find = bs_find
@@ -1,14 +1,17 @@
 "`Learner` support for computer vision"
 from ..torch_core import *
 from ..basic_train import *
+from ..basic_train import _progress_bar
 from ..basic_data import *
+from ..data_block import ItemList, LabelList
 from .image import *
 from . import models
 from ..callback import *
 from ..layers import *
 from ..callbacks.hooks import num_features_model
 
-__all__ = ['create_cnn', 'create_body', 'create_head', 'ClassificationInterpretation', 'unet_learner']
+__all__ = ['cache_body_features', 'create_cnn', 'create_body', 'create_head', 'ClassificationInterpretation', 'FeatureCache',
+           'unet_learner']
 # By default split models between first and second layer
 def _default_split(m:nn.Module): return (m[1],)
 # Split a resnet style model
@@ -78,6 +81,58 @@ def unet_learner(data:DataBunch, arch:Callable, pretrained:bool=True, blur_final
     apply_init(model[2], nn.init.kaiming_normal_)
     return learn
 
+def _cache_features(body:nn.Module, dl:DeviceDataLoader, fname:Path, no_bar:bool=False)->np.ndarray:
+    "Run `body` on `dl` in evaluation mode and save its activations in the `.npy` file `fname`, return them memory-mapped."
+    body.eval()
+    res,i = None,0
+    with torch.no_grad():
+        for xb,_ in _progress_bar(dl, no_bar, leave=False):
+            out = to_np(body(xb)).astype(np.float32)
+            if res is None: res = np.lib.format.open_memmap(fname, mode='w+', dtype=np.float32, shape=(len(dl.dataset),)+out.shape[1:])
+            res[i:i+len(out)] = out
+            i += len(out)
+    res.flush()
+    return np.load(fname, mmap_mode='r')
+
+class FeatureCache():
+    "The `data`, `model` and `layer_groups` of a `Learner` trained on cached body features, put back by `restore`."
+    def __init__(self, data:DataBunch, model:nn.Module, layer_groups:Collection[nn.Module]):
+        self.data,self.model,self.layer_groups = data,model,layer_groups
+
+    def restore(self, learn:Learner)->None:
+        "Train `learn` on the original data and full model again."
+        learn.data,learn.model,learn.layer_groups,learn.feature_cache = self.data,self.model,self.layer_groups,None
+
+def cache_body_features(learn:Learner, cache_dir:PathOrStr='features')->Learner:
+    "Compute the features of the frozen body of a `create_cnn` model once in `learn.path/cache_dir`, then only train the head on them."
+    model,data = learn.model,learn.data
+    assert isinstance(model, nn.Sequential) and len(model) == 2, "The model should be a body and a head, as built by `create_cnn`."
+    path = learn.path/cache_dir
+    path.mkdir(parents=True, exist_ok=True)
+    # The training set goes through the deterministic transforms of the validation set.
+    train_ds = data.train_ds
+    tfms,tfmargs = train_ds.tfms,train_ds.tfmargs
+    train_ds.tfms,train_ds.tfmargs = data.valid_ds.tfms,data.valid_ds.tfmargs
+    try: train_x = _cache_features(model[0], data.train_dl.new(shuffle=False, drop_last=False), path/'train_features.npy', learn.no_bar)
+    finally: train_ds.tfms,train_ds.tfmargs = tfms,tfmargs
+    valid_x = _cache_features(model[0], data.valid_dl, path/'valid_features.npy', learn.no_bar)
+    # `LabelList` links its labels to its inputs, so they are copied to keep the original datasets untouched.
+    cached = DataBunch.create(LabelList(ItemList(train_x, path=data.path), copy(data.train_ds.y)),
+                              LabelList(ItemList(valid_x, path=data.path), copy(data.valid_ds.y)),
+                              path=data.path, bs=data.batch_size, num_workers=0, device=data.device)
+    learn.feature_cache = FeatureCache(data, model, learn.layer_groups)
+    learn.data,learn.model = cached,model[1]
+    # Only the layer groups of the head are trained, as one group if the split mixes body and head layers.
+    head_layers = set(flatten_model(model[1]))
+    head_groups = [g for g in learn.layer_groups if all(l in head_layers for l in g)]
+    learn.layer_groups = head_groups if head_groups else [nn.Sequential(*flatten_model(model[1]))]
+    # The batchnorm layers of the body would be trained with `train_bn`, so they are frozen too. `freeze_to` puts them back.
+    requires_grad(model[0], False)
+    learn.create_opt(defaults.lr)
+    return learn
+
+Learner.cache_body_features = cache_body_features
+
 class ClassificationInterpretation():
     "Interpretation methods for classification models."
     def __init__(self, data:DataBunch, probs:Tensor, y_true:Tensor, losses:Tensor):
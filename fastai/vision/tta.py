@@ -1,7 +1,7 @@
 "Brings TTA (Test Time Functionality) to the `Learner` class. Use `learner.TTA()` instead"
 from ..torch_core import *
 from ..basic_train import *
-from ..basic_train import _loss_func2activ
+from ..basic_train import _loss_func2activ, _master_bar
 from ..basic_data import DatasetType
 from .transform import *
 
@@ -15,7 +15,7 @@ def _tta_only(learn:Learner, ds_type:DatasetType=DatasetType.Valid, scale:float=
     augm_tfm = [o for o in learn.data.train_ds.tfms if o.tfm not in
                (crop_pad, flip_lr, dihedral, zoom)]
     try:
-        pbar = master_bar(range(8))
+        pbar = _master_bar(range(8), learn.no_bar)
         for i in pbar:
             row = 1 if i&1 else 0
             col = 1 if i&2 else 0
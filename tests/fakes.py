@@ -0,0 +1,17 @@
+"Synthetic data and learners to test the training loop without downloading anything."
+from fastai.basics import *
+
+def fake_data(n_in:int=5, n_out:int=4, batch_size:int=5, train_length:int=None, valid_length:int=None, path:PathOrStr='.'):
+    "A classification `DataBunch` of random vectors of size `n_in` with `n_out` classes."
+    train_length,valid_length = ifnone(train_length, 2*batch_size),ifnone(valid_length, batch_size)
+    n = train_length + valid_length
+    xs = np.random.randn(n, n_in).astype(np.float32)
+    ys = np.arange(n) % n_out
+    return (ItemList(xs, path=path).split_by_idx(list(range(train_length, n)))
+            .label_from_list(ys).databunch(bs=batch_size, num_workers=0))
+
+def fake_learner(n_in:int=5, n_out:int=4, batch_size:int=5, train_length:int=None, valid_length:int=None,
+                 path:PathOrStr='.', **kwargs):
+    "A `Learner` with a linear model on `fake_data`."
+    data = fake_data(n_in, n_out, batch_size, train_length, valid_length, path=path)
+    return Learner(data, nn.Linear(n_in, n_out), **kwargs)
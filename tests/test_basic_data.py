@@ -0,0 +1,48 @@
+import pytest
+from tempfile import TemporaryDirectory
+from fastai.basics import *
+from fakes import *
+
+def test_prefetch_order():
+    data = fake_data(batch_size=4, train_length=40, valid_length=20)
+    plain = [x for x,y in data.valid_dl]
+    pf = data.valid_dl.new(shuffle=False)
+    pf.prefetch = 2
+    prefetched = [x for x,y in pf]
+    assert len(prefetched) == len(plain) == pf.n_batches == 5
+    for a,b in zip(plain, prefetched): assert torch.equal(a, b)
+    assert 0 <= pf.starvation <= 1
+
+def test_prefetch_exception_and_break():
+    data = fake_data(batch_size=4, train_length=40)
+    dl = data.train_dl.new()
+    dl.prefetch = 2
+    for i,b in enumerate(dl):
+        if i == 1: break
+    def _fail(b): raise ValueError('tfm failed')
+    dl.add_tfm(_fail)
+    with pytest.raises(ValueError): next(iter(dl))
+
+def test_share():
+    data = fake_data(batch_size=4, train_length=20, valid_length=8)
+    xs = data.train_ds.x.items.copy()
+    plain = [x for x,y in data.valid_dl]
+    with TemporaryDirectory() as path:
+        data.share(path)
+        assert isinstance(data.train_ds.x.items, SharedArray) and isinstance(data.valid_ds.y.items, SharedArray)
+        assert np.array_equal(data.train_ds.x.items, xs)
+        for a,(b,_) in zip(plain, data.valid_dl): assert torch.equal(a, b)
+
+def test_worker_pool():
+    src = fake_data(batch_size=4, train_length=20, valid_length=8)
+    data = DataBunch.create(src.train_ds, src.valid_ds, bs=4, num_workers=2, persistent_workers=True)
+    pool = data.train_dl.pool
+    assert pool is data.valid_dl.pool and data.single_dl.pool is None
+    assert len([b for b in data.train_dl]) == 5
+    pids = [w.pid for w in pool.workers]
+    for a,(b,_) in zip([x for x,y in src.valid_dl], data.valid_dl): assert torch.equal(a, b)
+    for i,b in enumerate(data.train_dl):
+        if i == 1: break
+    assert len([b for b in data.train_dl]) == 5
+    assert [w.pid for w in pool.workers] == pids
+    pool.shutdown()
@@ -0,0 +1,116 @@
+import pytest
+from fastai.basics import *
+from fakes import *
+
+def _train_losses(tmp_path, **kwargs):
+    torch.manual_seed(42)
+    np.random.seed(42)
+    learn = fake_learner(batch_size=4, train_length=40, path=tmp_path, metrics=accuracy, **kwargs)
+    learn.fit(2, 1e-2)
+    return learn
+
+def test_deferred_sync(tmp_path):
+    learn_sync  = _train_losses(tmp_path)
+    learn_defer = _train_losses(tmp_path, sync_every=3)
+    rec_s,rec_d = learn_sync.recorder,learn_defer.recorder
+    assert len(rec_d.losses) == len(rec_s.losses) == 20
+    np.testing.assert_allclose(np.array(rec_d.losses), np.array(rec_s.losses), rtol=1e-5)
+    np.testing.assert_allclose(rec_d.val_losses, rec_s.val_losses, rtol=1e-5)
+    assert float(rec_d.metrics[-1][0]) == pytest.approx(float(rec_s.metrics[-1][0]))
+
+class _BatchEndCb(Callback):
+    def on_batch_end(self, **kwargs): return True
+
+def test_callback_fast_path():
+    cb,noop = _BatchEndCb(),Callback()
+    assert has_event(cb, 'batch_end') and not has_event(cb, 'batch_begin')
+    cb_handler = CallbackHandler([cb, noop], [accuracy])
+    assert cb_handler.cb_events['batch_end'] == [cb]
+    assert cb_handler.cb_events['loss_begin'] == []
+    assert [type(m) for m in cb_handler.met_events['batch_end']] == [AverageMetric]
+    cb_handler.on_train_begin(1, None, [accuracy])
+    cb_handler.on_batch_begin(torch.zeros(2,2), torch.zeros(2))
+    assert cb_handler.on_batch_end(torch.tensor(0.))
+
+def _train_weights(tmp_path, batch_size, **kwargs):
+    torch.manual_seed(42)
+    np.random.seed(42)
+    learn = fake_learner(batch_size=batch_size, train_length=16, path=tmp_path, opt_func=optim.SGD, **kwargs)
+    learn.fit(1, 1e-1)
+    return learn.model.weight.detach().clone()
+
+def test_gradient_accumulation(tmp_path):
+    w_big   = _train_weights(tmp_path, 8)
+    w_accum = _train_weights(tmp_path, 4, n_accum=2)
+    assert torch.allclose(w_big, w_accum, atol=1e-6)
+    cb_handler = CallbackHandler(n_accum=3)
+    cb_handler.on_train_begin(1, None, [], epoch_len=4)
+    sizes = []
+    for i in range(4):
+        cb_handler.state_dict['num_batch'] = i
+        sizes.append(cb_handler.accum_size())
+    assert sizes == [3,3,3,1]
+
+def test_flat_params(tmp_path):
+    w_ref  = _train_weights(tmp_path, 4)
+    w_flat = _train_weights(tmp_path, 4, flat_params=True)
+    assert torch.allclose(w_ref, w_flat, atol=1e-6)
+    w_big  = _train_weights(tmp_path, 8)
+    w_flat_accum = _train_weights(tmp_path, 4, n_accum=2, flat_params=True)
+    assert torch.allclose(w_big, w_flat_accum, atol=1e-6)
+    learn = fake_learner(path=tmp_path, flat_params=True)
+    learn.create_opt(1e-3)
+    flat = learn.opt.params[0]
+    assert learn.model.weight.data_ptr() == flat.data_ptr()
+    assert learn.model.weight.grad.data_ptr() == flat.grad.data_ptr()
+
+def test_flat_params_moved(tmp_path):
+    w_ref = _train_weights(tmp_path, 4)
+    torch.manual_seed(42)
+    np.random.seed(42)
+    learn = fake_learner(batch_size=4, train_length=16, path=tmp_path, opt_func=optim.SGD, flat_params=True)
+    learn.create_opt(1e-1)
+    # Both conversions allocate new tensors for the parameters, out of the flat buffer.
+    learn.model.double().to(torch.float32)
+    learn.fit(1, 1e-1)
+    assert torch.allclose(w_ref, learn.model.weight, atol=1e-6)
+    assert learn.model.weight.data_ptr() == learn.opt.params[0].data_ptr()
+
+def test_save_preds(tmp_path):
+    learn = fake_learner(valid_length=12, path=tmp_path)
+    preds,targs,losses = learn.get_preds(with_loss=True)
+    res = learn.save_preds(tmp_path/'valid', with_loss=True)
+    assert len(res) == 3
+    for t,r in zip([preds,targs,losses], res): assert np.allclose(to_np(t), r)
+    assert np.load(tmp_path/'valid_preds.npy', mmap_mode='r').shape == (12,4)
+    res = learn.save_preds(tmp_path/'valid', with_target=False, n_batch=1)
+    assert len(res) == 1 and len(res[0]) < 12
+    assert np.load(tmp_path/'valid_preds.npy', mmap_mode='r').shape == res[0].shape
+    assert sum(len(b[0]) for b in learn.iter_preds()) == 12
+    it = learn.iter_preds()
+    next(it)
+    assert torch.is_grad_enabled()
+
+def test_predict_batch(tmp_path):
+    learn = fake_learner(path=tmp_path)
+    items = list(np.random.randn(7, 5).astype(np.float32))
+    res = learn.predict_batch(items, bs=3)
+    assert len(res) == 7
+    for o,(out,pred,raw) in zip(items, res):
+        out1,pred1,raw1 = learn.predict(o)
+        assert str(out) == str(out1) and pred == pred1
+        assert torch.allclose(raw, raw1, atol=1e-6)
+
+def test_value_history():
+    h = ValueHistory(max_len=8, capacity=2)
+    h.extend(range(100))
+    assert len(h) < 8 and h.n_iter == 100 and h.max == 99
+    assert np.array_equal(np.array(h), h.iterations)
+
+def test_recorder_max_len(tmp_path):
+    learn = fake_learner(batch_size=4, train_length=64, path=tmp_path)
+    learn.recorder.max_len = 10
+    learn.fit(2)
+    rec = learn.recorder
+    assert len(rec.losses) == len(rec.lrs) < 10 and rec.losses.n_iter == 32
+    assert np.array(rec.losses).dtype == np.float32
@@ -0,0 +1,41 @@
+import pytest
+from fastai.basics import *
+from fastai.vision import models
+from fastai.benchmarks.apps import *
+from fastai.benchmarks.callback import *
+from fastai.benchmarks.jit import *
+from fastai.benchmarks.optim import *
+from fastai.benchmarks.predict import *
+from fastai.benchmarks.serve import *
+from fastai.benchmarks.tabular import *
+
+def test_bench_apps(tmp_path):
+    res = bench_learner(tabular_bench_learner(tmp_path, n_items=100, n_cat=2, n_cont=3, bs=16), n_batch=2)
+    assert all(v > 0 for v in res.values())
+    res = bench_apps(['tabular'], n_batch=2, fname=tmp_path/'bench.json')
+    assert list(res['app']) == ['tabular']
+    assert np.allclose(compare_benchmarks(tmp_path/'bench.json', tmp_path/'bench.json').values, 1)
+
+def test_bench_callback_dispatch():
+    res = bench_callback_dispatch(n_cbs=(0,2), n_batch=5)
+    assert list(res['n_callbacks']) == [0,2] and (res['fast_path_us'] > 0).all()
+
+def test_bench_torchscript():
+    res = bench_torchscript(bs=1, n_iter=1)
+    assert list(res['model']) == ['cnn', 'tabular', 'text'] and (res['torchscript_ms'] > 0).all()
+
+def test_bench_weight_decay():
+    res = bench_weight_decay(models.resnet18, n_iter=1)
+    assert list(res['version']) == ['loop', 'grouped'] and (res['wd_ms'] > 0).all()
+
+def test_bench_predict():
+    res = bench_predict(n_items=20, bss=(8,), n_in=5)
+    assert list(res['bs']) == [1,8] and (res['items_per_s'] > 0).all()
+
+def test_bench_serve():
+    res = bench_serve(n_clients=(1,2), n_requests=8, n_in=5)
+    assert list(res['clients']) == [1,2] and (res['requests_per_s'] > 0).all()
+
+def test_bench_tabular_loading():
+    res = bench_tabular_loading(n_rows=200, n_cat=2, n_cont=3, bs=16, n_batch=2)
+    assert list(res['mode']) == ['per_item', 'batch_fetch', 'model_forward'] and (res['rows_per_s'] > 0).all()
@@ -2,6 +2,9 @@ import pytest, torch, fastai
 from fastai.torch_core import *
 from fastai.layers import *
 from math import isclose
+from fastai.basics import *
+from fastai.callbacks.fp16 import *
+from fakes import *
 cuda_required = pytest.mark.skipif(not torch.cuda.is_available(),
                                 reason="cuda enabled gpu is not available")
 a3b3b3 =torch.ones([1,3,3,3])
@@ -26,3 +29,33 @@ def test_to_half():
     half = to_half([t1,t2])
     assert isinstance(half[0],torch.HalfTensor)
     assert isinstance(half[1],torch.FloatTensor)
+
+def _fp16_learner(tmp_path, **kwargs):
+    learn = fake_learner(path=tmp_path)
+    learn.model.half()
+    learn.create_opt(1e-3)
+    Recorder(learn)
+    mp = MixedPrecision(learn, **kwargs)
+    mp.on_train_begin()
+    return learn,mp
+
+def test_dynamic_loss_scale(tmp_path):
+    learn,mp = _fp16_learner(tmp_path, loss_scale=1024., max_noskip=2)
+    w,b = learn.model.weight,learn.model.bias
+    w.grad,b.grad = torch.full_like(w, float('inf')),torch.zeros_like(b)
+    assert mp.on_backward_end()
+    assert mp.loss_scale == 512
+    w.grad,b.grad = torch.ones_like(w),torch.ones_like(b)
+    assert not mp.on_backward_end()
+    assert mp.loss_scale == 512
+    assert torch.allclose(mp.master_params[0][0].grad, torch.full(w.shape, 1/512))
+    assert not mp.on_backward_end()
+    assert mp.loss_scale == 1024
+    assert list(learn.recorder.loss_scales) == [1024, 512, 512]
+
+def test_grad_overflow():
+    p = torch.zeros(3).half()
+    p.grad = torch.tensor([1.,2.,3.]).half()
+    assert not grad_overflow([[p]])
+    p.grad[1] = float('nan')
+    assert grad_overflow([[p]])
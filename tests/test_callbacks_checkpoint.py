@@ -0,0 +1,42 @@
+import pytest
+from fastai.basics import *
+from fastai.callbacks import *
+from fakes import *
+
+def test_checkpoint_resume(tmp_path):
+    learn = fake_learner(batch_size=5, train_length=20, path=tmp_path)
+    learn.callback_fns.append(partial(CheckpointCallback, every=3, keep=2))
+    learn.fit_one_cycle(3, 1e-2)
+    ckpts = [f.name for f in sorted((tmp_path/'models').glob('checkpoint_*'))]
+    assert ckpts == ['checkpoint_6.pth', 'checkpoint_9.pth']
+
+    learn2 = Learner(learn.data, nn.Linear(5, 4)).resume()
+    assert learn2.resume_state['counters'] == {'epoch':2, 'iteration':9, 'num_batch':1}
+    learn2.fit_one_cycle(3, 1e-2)
+    assert learn2.recorder.nb_batches == learn.recorder.nb_batches == [4,4,4]
+    assert len(learn2.recorder.losses) == len(learn.recorder.losses)
+    # The batches left in the interrupted epoch come in the same order.
+    assert np.allclose(learn2.recorder.losses[-3:], learn.recorder.losses[-3:])
+    assert np.allclose(learn2.recorder.lrs, learn.recorder.lrs)
+    assert learn2.resume_state is None
+
+class _Counter(Callback):
+    def __init__(self, n:int=0): self.n = n
+    def get_state(self)->dict: return {'n':self.n}
+
+def test_callback_states():
+    state = CallbackHandler([_Counter(1), Callback(), _Counter(2)]).get_state()
+    assert state['callbacks'] == {'0__Counter':{'n':1}, '1__Counter':{'n':2}}
+    cbs = [_Counter(), _Counter()]
+    CallbackHandler(cbs).load_state(state)
+    assert [cb.n for cb in cbs] == [1,2]
+    with pytest.raises(ValueError): CallbackHandler([_Counter()]).load_state(state)
+
+def test_tracker_states():
+    learn = fake_learner()
+    cb = EarlyStoppingCallback(learn, patience=3)
+    cb.on_train_begin()
+    cb.best,cb.wait = 0.5,2
+    cb2 = EarlyStoppingCallback(learn, patience=3)
+    cb2.load_state(cb.get_state())
+    assert (cb2.best,cb2.wait) == (0.5,2)
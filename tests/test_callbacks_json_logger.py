@@ -0,0 +1,15 @@
+import pytest
+from fastai.basics import *
+from fastai.callbacks import *
+from fakes import *
+
+def test_json_logger(tmp_path):
+    learn = fake_learner(batch_size=4, train_length=16, path=tmp_path).headless(filename='log', every=0.)
+    assert learn.no_bar and not defaults.headless and not fake_learner(path=tmp_path).no_bar
+    learn.fit(2, 1e-2)
+    records = [json.loads(l) for l in open(tmp_path/'log.jsonl')]
+    batches = [r for r in records if r['type'] == 'batch']
+    epochs = [r for r in records if r['type'] == 'epoch']
+    assert len(batches) == 8 and len(epochs) == 2
+    assert all(r['items_per_s'] > 0 and 0 <= r['data_wait'] <= 1 and r['lr'] == 1e-2 for r in batches)
+    assert set(epochs[0]) >= {'train_loss', 'valid_loss', 'iteration', 'epoch', 'time'}
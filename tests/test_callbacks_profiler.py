@@ -0,0 +1,17 @@
+import pytest
+from fastai.basics import *
+from fastai.callbacks import *
+from fakes import *
+
+def test_profiler(tmp_path):
+    learn = fake_learner(batch_size=4, train_length=16, path=tmp_path).profile()
+    learn.fit(2, 1e-2)
+    prof = learn.profiler
+    assert len(prof.stats) == 2
+    assert all(t >= 0 for s in prof.stats for t in s.values())
+    assert list(prof.summary().columns) == ['data', 'forward', 'loss', 'backward', 'step', 'callbacks']
+    assert learn.recorder.names == ['epoch', 'train_loss', 'valid_loss']
+    assert isinstance(learn.data.train_dl, DeviceDataLoader)
+    assert {e['name'] for e in prof.events} == {'data', 'forward', 'loss', 'backward', 'step', 'callbacks'}
+    trace = json.load(open(prof.export()))
+    assert len(trace['traceEvents']) == len(prof.events)
@@ -179,3 +179,23 @@ def test_df_names_to_idx():
 def test_one_hot():
     assert all(one_hot([0,-1], 5) == np.array([1,0,0,0,1]))
 
+
+def test_share_array():
+    with TemporaryDirectory() as path:
+        a = share_array(np.random.randn(20, 3).astype(np.float32), Path(path)/'a.npy')
+        assert isinstance(a, SharedArray)
+        b = pickle.loads(pickle.dumps(a[2:5]))
+        assert np.array_equal(b, a[2:5]) and len(pickle.dumps(a)) < a.nbytes
+        items = np.empty(3, dtype=object)
+        for i,n in enumerate([4,0,2]): items[i] = np.arange(n, dtype=np.int64)
+        shared = share_array(items, Path(path)/'items.npy')
+        assert isinstance(shared, SharedRaggedArray)
+        assert all(isinstance(o, SharedArray) and np.array_equal(o, t) for o,t in zip(shared, items))
+        items = np.empty(100, dtype=object)
+        for i in range(100): items[i] = np.random.randn(i%7, 2)
+        shared = share_array(items, Path(path)/'ragged.npy')[np.arange(1, 100, 2)]
+        b = pickle.loads(pickle.dumps(shared))
+        assert isinstance(b, SharedRaggedArray) and all(np.array_equal(o, t) for o,t in zip(b, items[1::2]))
+        assert len(pickle.dumps(shared)) < len(pickle.dumps(np.asarray(shared)))
+        strs = array(['a', 'b'], dtype=object)
+        with pytest.warns(UserWarning): assert share_array(strs, Path(path)/'strs.npy') is strs
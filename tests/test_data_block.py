@@ -19,3 +19,18 @@ def test_wrong_order():
     path = untar_data(URLs.MNIST_TINY)
     with pytest.raises(Exception):
         src = ImageItemList.from_folder(path).label_from_folder().split_by_folder()
+
+def test_get_batch():
+    xs,ys = np.random.randn(20, 3).astype(np.float32),np.arange(20) % 4
+    data = FloatList(xs).split_by_idx(list(range(15, 20))).label_from_list(ys).databunch(bs=5, num_workers=0)
+    assert isinstance(data.train_dl.dl, BatchDataLoader) and data.valid_ds.batchable
+    x,y = data.valid_ds.get_batch(np.arange(5))
+    ex,ey = data_collate([data.valid_ds[i] for i in range(5)])
+    assert torch.equal(x, ex) and torch.equal(y, ey) and y.dtype == ey.dtype
+    assert len(list(data.train_dl)) == 3
+    # Samplers that aren't a permutation of the dataset are followed as they are.
+    dl = BatchDataLoader(data.train_ds, batch_size=5, sampler=RandomSampler(data.train_ds, replacement=True, num_samples=7))
+    assert [len(idxs) for idxs in dl.batch_idxs()] == [5,2]
+    # Lists without `get_batch` are loaded item by item.
+    data = ItemList(xs).split_by_idx(list(range(15, 20))).label_from_list(ys).databunch(bs=5, num_workers=0)
+    assert not data.valid_ds.batchable and type(data.train_dl.dl) == DataLoader
@@ -0,0 +1,45 @@
+import pytest
+from fastai.basics import *
+
+def _shards(path:Path, n_shards:int=4, n_items:int=10):
+    "`n_shards` npz shards of `n_items` records with their index as first input feature."
+    for i in range(n_shards):
+        idx = np.arange(i*n_items, (i+1)*n_items)
+        x = np.concatenate([idx[:,None], np.random.randn(n_items, 4)], 1).astype(np.float32)
+        np.savez(path/f'shard{i}.npz', x=x, y=idx % 2)
+
+@pytest.fixture
+def sd(tmp_path):
+    _shards(tmp_path)
+    return (StreamingItemList.from_folder(tmp_path, get_x=itemgetter('x')).split_by_shards(['shard3.npz'])
+            .label_from_func(itemgetter('y'), n_sample=15))
+
+def test_read_shard(tmp_path):
+    _shards(tmp_path, n_shards=1)
+    recs = list(read_shard(tmp_path/'shard0.npz'))
+    assert len(recs) == shard_len(tmp_path/'shard0.npz') == 10
+    assert recs[3]['x'][0] == 3 and recs[3]['y'] == 1
+
+def test_streaming_label_list(sd):
+    assert len(sd.train.items) == 3 and len(sd.valid.items) == 1
+    assert len(sd.train) == 30 and sd.train.c == 2 and list(sd.train.classes) == [0,1]
+    assert [int(x[0]) for x,y in sd.valid] == list(range(30, 40))
+
+@pytest.mark.parametrize('num_workers', [0, 2])
+def test_streaming_databunch(sd, num_workers):
+    data = sd.databunch(bs=4, num_workers=num_workers, buffer_size=8)
+    epochs = [torch.cat([x[:,0] for x,y in data.train_dl]).long().tolist() for _ in range(2)]
+    for idx in epochs: assert len(set(idx)) == len(idx) and set(idx) <= set(range(30))
+    assert epochs[0] != epochs[1]
+    # With 2 workers, one reads 20 records and the other 10, each drops its last partial batch.
+    assert len(epochs[0]) == 28 and len(data.train_dl) == 7
+    assert len(data.valid_dl) == len(list(data.valid_dl)) == 3
+    xs,ys = zip(*[(x,y) for x,y in data.valid_dl])
+    assert torch.cat(xs)[:,0].long().tolist() == list(range(30, 40))
+    assert torch.cat(ys).tolist() == [i % 2 for i in range(30, 40)]
+
+def test_streaming_fit(sd):
+    data = sd.databunch(bs=4, num_workers=0)
+    learn = Learner(data, nn.Linear(5, 2), metrics=accuracy)
+    learn.fit(1)
+    assert len(learn.recorder.losses) == 7
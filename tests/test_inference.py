@@ -0,0 +1,37 @@
+import pytest
+from fastai.basics import *
+from fastai.text.models import *
+from fakes import *
+
+def test_export_torchscript(tmp_path):
+    learn = fake_learner(path=tmp_path)
+    path = learn.export_torchscript()
+    model = torch.jit.load(str(path))
+    x,_ = learn.data.one_batch(detach=False, denorm=False)
+    assert torch.allclose(model(x), learn.model.eval()(x))
+    assert json.load(open(path.with_suffix('.json')))['classes'] == [str(c) for c in learn.data.classes]
+    assert (tmp_path/'export_data.pkl').is_file() and not (tmp_path/'export.pkl').exists()
+    items = np.random.randn(3, 5).astype(np.float32)
+    loaded = load_learner(tmp_path)
+    for (out,_,raw),(out_l,_,raw_l) in zip(learn.predict_batch(list(items)), loaded.predict_batch(list(items))):
+        assert str(out) == str(out_l) and torch.allclose(raw, raw_l, atol=1e-5)
+
+def test_trace_text_models():
+    clas = get_rnn_classifier(4, 12, 3, 50, 10, 12, 2, 1, [30, 20, 3], [0.1, 0.1])
+    lm = get_language_model(50, 10, 12, 2, 1)
+    for model in [clas, lm]:
+        traced = trace_model(model, torch.randint(0, 50, (10, 2)))
+        # Another batch size, and a sequence longer than `max_seq` for the classifier.
+        x = torch.randint(0, 50, (25, 5))
+        model.reset()
+        assert torch.allclose(traced(x), model.eval()(x)[0], atol=1e-5)
+
+def test_quantize(tmp_path):
+    learn = fake_learner(path=tmp_path, metrics=accuracy)
+    qmodel = learn.quantize()
+    x,_ = learn.data.one_batch(detach=False, denorm=False)
+    assert torch.allclose(qmodel(x.cpu()), learn.model.eval()(x).cpu(), atol=0.1)
+    assert next(learn.model.parameters()).dtype == torch.float32
+    report = learn.quantization_report(qmodel)
+    assert list(report.index) == ['fp32', 'int8', 'delta']
+    assert {'loss', 'accuracy', 'latency_ms', 'size_mb'} <= set(report.columns)
@@ -0,0 +1,37 @@
+import pytest
+from fastai.basics import *
+from fastai.serve import *
+from fastai.serve import _read_http, _http_message
+from fakes import *
+
+async def _post(port, item):
+    reader,writer = await asyncio.open_connection('127.0.0.1', port)
+    writer.write(_http_message('POST /predict HTTP/1.1', json.dumps({'item':item}).encode()))
+    _,status,_,body = await _read_http(reader)
+    writer.close()
+    return status,json.loads(body)
+
+async def _post_all(port, items): return await asyncio.gather(*[_post(port, o) for o in items])
+
+def test_inference_server(tmp_path):
+    learn = fake_learner(path=tmp_path)
+    server = InferenceServer(learn, max_bs=4, max_wait_ms=50, item_fn=partial(np.array, dtype=np.float32))
+    items = np.random.randn(6, 5).astype(np.float32).tolist()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(server.start(port=0))
+        res = loop.run_until_complete(_post_all(server.port, items))
+        loop.run_until_complete(server.stop())
+    finally: loop.close()
+    for o,(status,r) in zip(items, res):
+        assert status == '200'
+        out,_,raw = learn.predict(np.array(o, dtype=np.float32))
+        assert r['prediction'] == str(out)
+        assert np.allclose(r['output'], to_np(raw), atol=1e-5)
+    stats = server.stats()
+    assert stats['requests'] == 6 and stats['batches'] < 6
+
+def test_inference_server_exported(tmp_path):
+    fake_learner(path=tmp_path).export_torchscript()
+    server = InferenceServer(tmp_path, max_bs=4)
+    assert isinstance(server.learn, Learner) and isinstance(server.learn.model, torch.jit.ScriptModule)
@@ -0,0 +1,32 @@
+import pytest
+from fastai.tabular import *
+from fastai.collab import *
+
+def _check_get_batch(ds):
+    idxs = np.arange(4)
+    b,e = ds.get_batch(idxs),data_collate([ds[i] for i in idxs])
+    for o,eo in zip(b, e):
+        for t,et in (zip(o, eo) if is_listy(o) else [(o, eo)]): assert torch.equal(t, et) and t.dtype == et.dtype
+
+def test_tabular_get_batch():
+    df = pd.DataFrame({'a':list('xyzx')*5, 'b':np.random.randn(20), 'c':np.random.randn(20), 'y':np.arange(20) % 2})
+    data = TabularDataBunch.from_df('.', df, 'y', valid_idx=range(4), procs=[Categorify, Normalize],
+                                    cat_names=['a'], cont_names=['b','c'], bs=4, num_workers=0)
+    assert isinstance(data.train_dl.dl, BatchDataLoader)
+    _check_get_batch(data.valid_ds)
+
+def test_collab_get_batch():
+    ratings = pd.DataFrame({'user':np.arange(20) % 5, 'item':np.arange(20) % 7, 'rating':np.random.rand(20).astype(np.float32)})
+    series2cat(ratings, 'user', 'item')
+    data = CollabDataBunch.from_df(ratings, seed=0, bs=4, num_workers=0)
+    _check_get_batch(data.valid_ds)
+
+def test_batch_fetch_sampling():
+    df = pd.DataFrame({'b':np.arange(10, dtype=np.float32), 'y':np.arange(10) % 2})
+    src = TabularList.from_df(df, cont_names=['b']).split_by_idx([0]).label_from_df(cols='y')
+    data = src.databunch(bs=4, num_workers=0)
+    xs = torch.cat([xb[1][:,0] for xb,_ in data.train_dl.dl])
+    assert len(xs) == 8 and len(set(xs.tolist())) == 8
+    vs = torch.cat([xb[1][:,0] for xb,_ in data.fix_dl.dl])
+    assert torch.equal(vs, tensor(np.arange(1, 10, dtype=np.float32)))
+    assert type(src.databunch(bs=4, num_workers=0, batch_fetch=False).train_dl.dl) == DataLoader
@@ -1,6 +1,7 @@
 import pytest, torch, fastai
 from fastai.torch_core import *
 from fastai.layers import *
+from fastai.callback import OptimWrapper
 from math import isclose
 
 a=[1,2,3]
@@ -97,3 +98,29 @@ def test_tensor_array_monkey_patch():
     t = torch.ones(a)
     t = np.array(t,dtype=float)
     assert np.all(t == t), "Tensors did not properly convert to numpy arrays with a dtype set"
+
+def test_foreach_mul_():
+    ts = [torch.ones(2,3), torch.ones(4)]
+    foreach_mul_(ts, 0.5)
+    for t in ts: assert torch.all(t == 0.5)
+
+def _loop_wd(opt):
+    "The per-parameter weight decay `OptimWrapper.apply_wd` replaces."
+    for lr,wd,pg1,pg2 in zip(opt._lr,opt._wd,opt.opt.param_groups[::2],opt.opt.param_groups[1::2]):
+        for p in pg1['params']: p.data.mul_(1 - wd*lr)
+        if opt.bn_wd:
+            for p in pg2['params']: p.data.mul_(1 - wd*lr)
+
+def test_apply_wd():
+    model = nn.Sequential(nn.Linear(3,4), nn.BatchNorm1d(4), nn.Linear(4,2), nn.BatchNorm1d(2))
+    for p in model.parameters(): p.data.normal_()
+    orig,models = deepcopy(model),[model, deepcopy(model)]
+    opts = [OptimWrapper.create(optim.SGD, [1e-2,1e-1], [m[:2], m[2:]], wd=[1e-2,1e-1], true_wd=True, bn_wd=False)
+            for m in models]
+    opts[0].apply_wd()
+    _loop_wd(opts[1])
+    for p,q in zip(*[m.parameters() for m in models]): assert torch.allclose(p, q)
+    # Only the weights of the linear layers are decayed with `bn_wd=False`, by the factor of their layer group.
+    assert torch.allclose(model[0].weight, orig[0].weight * (1 - 1e-2*1e-2))
+    assert torch.allclose(model[2].weight, orig[2].weight * (1 - 1e-1*1e-1))
+    assert torch.equal(model[1].weight, orig[1].weight) and torch.equal(model[3].bias, orig[3].bias)
@@ -0,0 +1,44 @@
+import pytest
+from fastai.basics import *
+from fakes import *
+
+def test_autotune(tmp_path):
+    learn = fake_learner(batch_size=4, train_length=32, path=tmp_path)
+    w = learn.model.weight.detach().clone()
+    n_threads,cpus = torch.get_num_threads(),defaults.cpus
+    try:
+        res = learn.autotune(threads=[1,2], workers=[0,1], n_batch=3, save=False)
+        assert len(res) == 4 and (res['batch_ms'] > 0).all()
+        best = res.loc[res['batch_ms'].idxmin()]
+        assert torch.get_num_threads() == best['threads']
+        assert learn.data.train_dl.num_workers == learn.data.valid_dl.num_workers == best['workers']
+        assert learn.data.single_dl.num_workers == 0
+        assert torch.equal(learn.model.weight, w)
+        learn = fake_learner(batch_size=4, train_length=4, path=tmp_path)
+        assert len(learn.data.train_dl) == 1
+        res = learn.autotune(threads=[1], workers=[0], n_batch=3, save=False)
+        assert len(res) == 1 and res['batch_ms'][0] > 0
+    finally: torch.set_num_threads(n_threads); defaults.cpus = cpus
+
+def test_config_tuned(tmp_path):
+    fpath = tmp_path/'config.yml'
+    assert Config.tuned(fpath) == {}
+    Config.save({'data_path':'~/data', 'num_threads':2, 'num_workers':3}, fpath)
+    assert Config.tuned(fpath) == {'num_threads':2, 'num_workers':3}
+    n_threads,cpus = torch.get_num_threads(),defaults.cpus
+    try:
+        assert apply_tuned(fpath) == {'num_threads':2, 'num_workers':3}
+        assert (torch.get_num_threads(),defaults.cpus) == (2,3)
+    finally: torch.set_num_threads(n_threads); defaults.cpus = cpus
+
+def test_bs_find(tmp_path):
+    learn = fake_learner(batch_size=4, train_length=64, path=tmp_path)
+    w = learn.model.weight.detach().clone()
+    res = learn.bs_find(start_bs=2, end_bs=8, n_batch=2)
+    assert list(res['bs']) == [2,4,8] and (res['items_per_s'] > 0).all()
+    assert torch.equal(learn.model.weight, w)
+    assert learn.data.batch_size == 4
+    assert len(learn.bs_find(start_bs=2, max_mem=0.)) == 0
+    with pytest.warns(UserWarning):
+        res = learn.bs_find(start_bs=2, end_bs=64, n_batch=2)
+    assert list(res['bs']) == [2,4,8,16]
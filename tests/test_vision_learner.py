@@ -0,0 +1,28 @@
+import pytest
+from fastai.vision import *
+
+def _fake_images(path, n=16, size=32):
+    for i in range(n):
+        fname = path/f'class{i%2}'/f'{i}.png'
+        fname.parent.mkdir(parents=True, exist_ok=True)
+        PIL.Image.fromarray(np.random.randint(0, 256, (size,size,3), dtype=np.uint8)).save(fname)
+
+def test_cache_body_features(tmp_path):
+    _fake_images(tmp_path)
+    data = (ImageItemList.from_folder(tmp_path).random_split_by_pct(0.25, seed=0).label_from_folder()
+            .transform(get_transforms(), size=32).databunch(bs=4, num_workers=0, device=torch.device('cpu')))
+    learn = create_cnn(data, models.resnet18, pretrained=False)
+    learn.freeze()
+    model,body_w = learn.model,learn.model[0][0].weight.detach().clone()
+    layer_groups = learn.layer_groups
+    learn.cache_body_features()
+    assert learn.model is model[1] and learn.data is not data
+    assert learn.layer_groups == layer_groups[-1:]
+    assert (tmp_path/'features'/'train_features.npy').is_file()
+    assert learn.data.train_ds[0][0].shape == (512,1,1)
+    learn.fit(1)
+    learn.unfreeze()
+    assert learn.model is model and learn.data is data and learn.feature_cache is None
+    assert learn.layer_groups == layer_groups
+    assert torch.equal(model[0][0].weight, body_w)
+    assert all(p.requires_grad for p in model.parameters())
@@ -29,7 +29,7 @@ def convert_into_dataframe(buffer):
 
 def get_train_losses(learn):
     "Returns list of training losses at the end of each training epoch."
-    np_losses = [to_np(l).item() for l in learn.recorder.losses]
+    np_losses = list(learn.recorder.losses)
     batch_size = len(learn.data.train_dl)
     return [batch[-1] for batch in partition(np_losses, batch_size)]
 